@@ -0,0 +1,150 @@
+# === analytics.py ===
+# Analysis functions behind calculations.py.
+#
+# Only the loaders (load_matrix, load_prices) touch storage: they open the
+# database to check the snapshot and rebuild it if it is stale (see
+# snapshot.py). Pass them an already-loaded snapshot to skip that. Everything
+# from price_kernel on is pure: it takes arrays and returns new ones, so each
+# stage can be timed, cached or reused by other jobs on its own.
+# calculations.py is the CLI that renders the results.
+
+import numpy as np
+from periods import month_key, months_to_datetime64
+from snapshot import load_snapshot
+
+# Asset name: series_id of the monthly price used for it
+ASSETS = {
+    "btc": "BTC-USD.open",
+    "sp": "SPY.close",
+    "gold": "GLD.close",
+    "oil": "DCOILWTICO",
+}
+CPI_SERIES = "CPIAUCSL"
+GOLD_CHANGE_SERIES = "GLD.change"   # 1 = up, 0 = down (see Gold_Change)
+
+
+# === Load series into one column-oriented matrix ===
+# series_ids: columns, in order. start/end: optional month range, end exclusive
+# (anything periods.month_key accepts: "YYYY-MM", datetime, datetime64).
+# Returns (index, matrix): index is the datetime64[M] union of the series'
+# months, matrix is a C-contiguous float64 array of shape (months, series)
+# with NaN wherever a series has no value. Works on the memory-mapped
+# snapshot with array operations only, so no Python object is created per row.
+# snapshot: {series_id: (periods, values)} as returned by load_snapshot();
+# None loads it here.
+def load_matrix(series_ids, start=None, end=None, snapshot=None):
+    if snapshot is None:
+        snapshot = load_snapshot(series_ids)
+    lo = month_key(start) if start is not None else None
+    hi = month_key(end) if end is not None else None
+
+    # Slice each series to the range; searchsorted on the mapped keys, no copy
+    selected = []
+    for sid in series_ids:
+        periods, values = snapshot[sid]
+        first = np.searchsorted(periods, lo) if lo is not None else 0
+        last = np.searchsorted(periods, hi) if hi is not None else len(periods)
+        selected.append((periods[first:last], values[first:last]))
+
+    periods = np.unique(np.concatenate([p for p, _ in selected]))
+    matrix = np.full((len(periods), len(series_ids)), np.nan)
+    for column, (series_periods, values) in enumerate(selected):
+        matrix[np.searchsorted(periods, series_periods), column] = values
+    return months_to_datetime64(periods), matrix
+
+
+# === Load every asset, CPI and gold direction ===
+# Returns (dates, prices, cpi, gold_changes): prices is a (months, assets)
+# matrix with columns in ASSETS order; cpi and gold_changes are vectors.
+def load_prices(start=None, end=None, snapshot=None):
+    series_ids = list(ASSETS.values()) + [CPI_SERIES, GOLD_CHANGE_SERIES]
+    dates, matrix = load_matrix(series_ids, start, end, snapshot)
+    assets = len(ASSETS)
+    return dates, np.ascontiguousarray(matrix[:, :assets]), matrix[:, assets], matrix[:, assets + 1]
+
+
+# === Real prices, normalized index and returns for every asset at once ===
+# prices: (months, assets) matrix; deflator: (months,) vector such as CPI.
+# The deflator broadcasts across the asset columns, so any number of assets
+# is one set of array operations. Returns a dict of arrays:
+#   real         prices / deflator                              (months, assets)
+#   normalized   real rescaled so each asset's first value = base (months, assets)
+#   returns      simple month-over-month returns                (months - 1, assets)
+#   log_returns  log(1 + returns)                               (months - 1, assets)
+# Missing values (NaN) stay missing: a return is NaN unless both of its months
+# are present, and an asset that starts late is normalized to its first
+# available month.
+def price_kernel(prices, deflator, base=100):
+    prices = np.asarray(prices, dtype="float64")
+    real = prices / np.asarray(deflator, dtype="float64")[:, None]
+    returns = np.diff(prices, axis=0) / prices[:-1]
+    return {
+        "real": real,
+        "normalized": real / first_valid(real) * base,
+        "returns": returns,
+        "log_returns": np.log1p(returns),
+    }
+
+
+# === First non-NaN value of each column (NaN if a column has none) ===
+def first_valid(matrix):
+    # argmax has nothing to reduce over an empty matrix
+    if matrix.shape[0] == 0:
+        return np.full(matrix.shape[1], np.nan)
+    valid = ~np.isnan(matrix)
+    rows = np.argmax(valid, axis=0)
+    return np.where(valid.any(axis=0), matrix[rows, np.arange(matrix.shape[1])], np.nan)
+
+
+# === Pairwise-complete Pearson correlation between the columns of a matrix ===
+# Each pair uses every month where both columns are present, so series of
+# different lengths are compared over their overlap. All pairs are computed
+# together as matrix products over the NaN mask; pairs with fewer than two
+# shared months, or no variance, are NaN.
+def correlation_matrix(matrix):
+    matrix = np.asarray(matrix, dtype="float64")
+    mask = (~np.isnan(matrix)).astype("float64")
+
+    # Center each column first (keeps the sums small), then zero the gaps
+    centered = np.where(mask > 0, matrix - nan_mean(matrix), 0.0)
+    counts = mask.T @ mask                      # [i, j] = months both present
+    sums = centered.T @ mask                    # [i, j] = sum of column i over those months
+    squares = (centered ** 2).T @ mask          # [i, j] = sum of column i squared
+    products = centered.T @ centered            # [i, j] = sum of i * j
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = products - sums * sums.T / counts
+        var_i = squares - sums ** 2 / counts
+        corr = cov / np.sqrt(var_i * var_i.T)
+    corr[counts < 2] = np.nan
+    return np.clip(corr, -1, 1)
+
+
+# === Column means and standard deviations ignoring NaN ===
+# NaN for columns with no values (no warnings, unlike np.nanmean on empty slices).
+def nan_mean(matrix):
+    valid = ~np.isnan(matrix)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.sum(np.where(valid, matrix, 0.0), axis=0) / np.sum(valid, axis=0)
+
+
+def nan_std(matrix):
+    valid = ~np.isnan(matrix)
+    deviations = np.where(valid, matrix - nan_mean(matrix), 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.sqrt(np.sum(deviations * deviations, axis=0) / np.sum(valid, axis=0))
+
+
+# === Mean monthly return in percent, per column (missing months skipped) ===
+def average_returns(returns):
+    return nan_mean(returns) * 100
+
+
+# === Standard deviation of monthly returns in percent, per column (missing months skipped) ===
+def volatility(returns):
+    return nan_std(returns) * 100
+
+
+# === Number of months gold went up and down ===
+def gold_change_counts(gold_changes):
+    return {"down": int(np.sum(gold_changes == 0)), "up": int(np.sum(gold_changes == 1))}
@@ -1,186 +1,184 @@
-import sqlite3
-from datetime import datetime
-import matplotlib.pyplot as plt
-import seaborn as sns
+# === calculations.py ===
+# Command-line report over analytics.py: appends the tables to
+# calculations_output.txt and renders the six charts.
+
+import argparse
 import numpy as np
+import analytics
+import rolling
+from db import use_database
+
+OUTPUT_FILE = "calculations_output.txt"
+LABELS = ['btc', 'sp500', 'gold', 'oil', 'cpi']
+BTC, GOLD = list(analytics.ASSETS).index("btc"), list(analytics.ASSETS).index("gold")
 
-# === CONNECT TO DATABASE AND FETCH DATA ===
-conn = sqlite3.connect("financial_data.db")
-cursor = conn.cursor()
-
-# Fetch data from Combined_Prices table
-query = """
-SELECT 
-    date, 
-    btc_price, 
-    sp500_price, 
-    gold_close, 
-    oil_price, 
-    cpi_value,
-    gold_change
-FROM Combined_Prices
-ORDER BY date ASC
-"""
-cursor.execute(query)
-rows = cursor.fetchall()
-
-# === PARSE RAW SQL DATA INTO LISTS ===
-dates, btc, sp, gold, oil, cpi, gold_changes = [], [], [], [], [], [], []
-
-for row in rows:
-    dates.append(datetime.strptime(row[0], "%Y-%m"))
-    btc.append(row[1])
-    sp.append(row[2])
-    gold.append(row[3])
-    oil.append(row[4])
-    cpi.append(row[5])
-
-
-# === CALCULATE PRICE-TO-CPI RATIOS ===
-btc_to_cpi = [b / c for b, c in zip(btc, cpi)]
-sp_to_cpi = [s / c for s, c in zip(sp, cpi)]
-gold_to_cpi = [g / c for g, c in zip(gold, cpi)]
-oil_to_cpi = [o / c for o, c in zip(oil, cpi)]
 
 # === WRITE FIRST 20 PRICE/CPI RATIO ROWS ===
-with open("calculations_output.txt", "a") as f:
+# ratios: (months, assets) real prices, columns btc, sp, gold, oil
+def write_ratio_table(f, dates, ratios):
     f.write("Price-to-CPI Ratios (First 20 Rows):\n")
     f.write("Date       BTC/CPI  SP500/CPI  Gold/CPI  Oil/CPI\n")
     for i in range(min(20, len(dates))):
-        f.write(f"{dates[i].strftime('%Y-%m')}  "
-                f"{btc_to_cpi[i]:8.2f}  "
-                f"{sp_to_cpi[i]:10.2f}  "
-                f"{gold_to_cpi[i]:9.2f}  "
-                f"{oil_to_cpi[i]:8.2f}\n")
-
-# === CORRELATION MATRIX ===
-data_matrix = np.array([btc, sp, gold, oil, cpi])
-corr_matrix = np.corrcoef(data_matrix)
-labels = ['btc', 'sp500', 'gold', 'oil', 'cpi']
-
-with open("calculations_output.txt", "a") as f:
+        btc, sp, gold, oil = ratios[i]
+        f.write(f"{dates[i]}  "
+                f"{btc:8.2f}  "
+                f"{sp:10.2f}  "
+                f"{gold:9.2f}  "
+                f"{oil:8.2f}\n")
+
+
+# === WRITE CORRELATION MATRIX ===
+def write_correlation(f, corr_matrix, labels=LABELS):
     f.write("\nCorrelation Matrix:\n")
     f.write("{:<8}".format("") + "".join(f"{label:<10}" for label in labels) + "\n")
     for i, row in enumerate(corr_matrix):
         f.write(f"{labels[i]:<8}" + "".join(f"{val:<10.2f}" for val in row) + "\n")
-# === GRAPH: Normalized Price-to-CPI (Log) ===
-plt.figure(figsize=(12, 6))
-plt.plot(dates, [x / btc_to_cpi[0] * 100 for x in btc_to_cpi], label='Bitcoin / CPI')
-plt.plot(dates, [x / sp_to_cpi[0] * 100 for x in sp_to_cpi], label='S&P500 / CPI')
-plt.plot(dates, [x / gold_to_cpi[0] * 100 for x in gold_to_cpi], label='Gold / CPI')
-plt.plot(dates, [x / oil_to_cpi[0] * 100 for x in oil_to_cpi], label='Oil / CPI')
-plt.xlabel("Date")
-plt.ylabel("Log Normalized Price-to-CPI Ratio (Base = 100)")
-plt.yscale("log")
-plt.title("Normalized Price-to-CPI Ratios Over Time (Log Scale)")
-plt.legend()
-plt.grid(True, which='both', linestyle='--', linewidth=0.5)
-plt.tight_layout()
-plt.savefig("price_to_cpi_ratio_log.png")
-plt.close()
-
-# === GRAPH: Bitcoin vs Gold ===
-plt.figure(figsize=(8, 6))
-sns.scatterplot(x=gold, y=btc)
-plt.xlabel("Gold Price (USD)")
-plt.ylabel("Bitcoin Price (USD)")
-plt.title("Bitcoin vs Gold Prices")
-plt.grid(True)
-plt.tight_layout()
-plt.savefig("btc_vs_gold_scatter.png")
-plt.close()
-
-# === RETURNS & VOLATILITY ===
-returns = {
-    "btc": [],
-    "sp": [],
-    "gold": [],
-    "oil": []
-}
-
-for i in range(1, len(dates)):
-    returns["btc"].append((btc[i] - btc[i - 1]) / btc[i - 1])
-    returns["sp"].append((sp[i] - sp[i - 1]) / sp[i - 1])
-    returns["gold"].append((gold[i] - gold[i - 1]) / gold[i - 1])
-    returns["oil"].append((oil[i] - oil[i - 1]) / oil[i - 1])
-
-# Average Returns
-average_returns = {k: np.mean(v) * 100 for k, v in returns.items()}
-with open("calculations_output.txt", "a") as f:
-    f.write("\nAverage Monthly Returns (%):\n")
-    for asset, avg in average_returns.items():
-        f.write(f"{asset}: {avg:.2f}%\n")
-
-plt.figure(figsize=(8, 6))
-plt.bar(average_returns.keys(), average_returns.values())
-plt.title("Average Monthly Returns (%)")
-plt.ylabel("Average % Return")
-plt.grid(True)
-plt.tight_layout()
-plt.savefig("avg_monthly_returns.png")
-plt.close()
-
-# Correlation Heatmap
-plt.figure(figsize=(8, 6))
-sns.heatmap(corr_matrix, xticklabels=labels, yticklabels=labels, annot=True, cmap='coolwarm')
-plt.title("Correlation Heatmap Between Assets")
-plt.tight_layout()
-plt.savefig("correlation_heatmap.png")
-plt.close()
-
-# Volatility
-volatility = {k: np.std(v) * 100 for k, v in returns.items()}
-with open("calculations_output.txt", "a") as f:
-    f.write("\nVolatility of Monthly Returns (%):\n")
-    for asset, vol in volatility.items():
-        f.write(f"{asset}: {vol:.2f}%\n")
-
-plt.figure(figsize=(8, 6))
-plt.bar(volatility.keys(), volatility.values(), color='orange')
-plt.title("Volatility of Monthly Returns (%)")
-plt.ylabel("Standard Deviation (%)")
-plt.grid(True)
-plt.tight_layout()
-plt.savefig("volatility_bar_chart.png")
-plt.close()
-
-
-# === CONNECT TO DATABASE AND FETCH GOLD CHANGE DATA ===
-conn = sqlite3.connect("financial_data.db")
-cursor = conn.cursor()
-
-# Get count of up/down months using Gold_Change.label
-cursor.execute("""
-    SELECT gc.label, COUNT(*) 
-    FROM Combined_Prices cp
-    JOIN Gold_Change gc ON cp.gold_change = gc.id
-    GROUP BY gc.label
-""")
-
-# Store results in a dictionary
-change_counts = {"down": 0, "up": 0}
-for label, count in cursor.fetchall():
-    change_counts[label.lower()] = count
-
-conn.close()
-
-# === WRITE TO FILE ===
-with open("calculations_output.txt", "a") as f:
+
+
+# === WRITE A PER-ASSET PERCENTAGE SECTION ===
+def write_percentages(f, title, values):
+    f.write(f"\n{title}:\n")
+    for asset, value in values.items():
+        f.write(f"{asset}: {value:.2f}%\n")
+
+
+# === WRITE GOLD UP/DOWN COUNTS ===
+def write_gold_counts(f, change_counts):
     f.write("\nGold Price Movement Counts:\n")
     f.write(f"Months Gold Went UP:   {change_counts['up']}\n")
     f.write(f"Months Gold Went DOWN: {change_counts['down']}\n")
 
-# === GRAPH: Gold Price Movement Bar Chart ===
-# === GRAPH: Gold Price Movement Pie Chart ===
-plt.figure(figsize=(6, 6))
-labels = ["Down", "Up"]
-sizes = [change_counts["down"], change_counts["up"]]
-colors = ["red", "green"]
-explode = (0.05, 0.05)  # Slightly separate both slices
-
-plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%',
-        startangle=90, explode=explode, shadow=True)
-plt.title("Monthly Gold Price Movement")
-plt.tight_layout()
-plt.savefig("gold_up_down_chart.png")
-plt.close()
+
+# === WRITE LATEST ROLLING VOLATILITY FOR EACH WINDOW ===
+# stats: rolling.rolling_stats over the monthly returns, {window: {...}}
+# Return row t is the change into dates[t + 1]. Each asset gets its latest
+# full window, which ends before the report's last month if that month is
+# missing for the asset, so every value is printed with the month it ends at.
+def write_rolling(f, dates, stats):
+    for window, window_stats in stats.items():
+        vol = window_stats["vol"] * 100
+        f.write(f"\nVolatility of Monthly Returns, Latest Full {window}-Month Window (%):\n")
+        for column, asset in enumerate(analytics.ASSETS):
+            rows = np.flatnonzero(~np.isnan(vol[:, column]))
+            if len(rows):
+                f.write(f"{asset}: {vol[rows[-1], column]:.2f}% (to {dates[rows[-1] + 1]})\n")
+            else:
+                f.write(f"{asset}: n/a (no {window} consecutive monthly returns)\n")
+
+
+# === RENDER THE SIX CHARTS ===
+# Imported here so the text report never pays for matplotlib/seaborn.
+def render_charts(dates, prices, normalized, corr_matrix, average_returns, volatility, change_counts):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # === GRAPH: Normalized Price-to-CPI (Log) ===
+    plt.figure(figsize=(12, 6))
+    for column, label in enumerate(['Bitcoin / CPI', 'S&P500 / CPI', 'Gold / CPI', 'Oil / CPI']):
+        plt.plot(dates, normalized[:, column], label=label)
+    plt.xlabel("Date")
+    plt.ylabel("Log Normalized Price-to-CPI Ratio (Base = 100)")
+    plt.yscale("log")
+    plt.title("Normalized Price-to-CPI Ratios Over Time (Log Scale)")
+    plt.legend()
+    plt.grid(True, which='both', linestyle='--', linewidth=0.5)
+    plt.tight_layout()
+    plt.savefig("price_to_cpi_ratio_log.png")
+    plt.close()
+
+    # === GRAPH: Bitcoin vs Gold ===
+    plt.figure(figsize=(8, 6))
+    sns.scatterplot(x=prices[:, GOLD], y=prices[:, BTC])
+    plt.xlabel("Gold Price (USD)")
+    plt.ylabel("Bitcoin Price (USD)")
+    plt.title("Bitcoin vs Gold Prices")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig("btc_vs_gold_scatter.png")
+    plt.close()
+
+    # Average Returns
+    plt.figure(figsize=(8, 6))
+    plt.bar(average_returns.keys(), average_returns.values())
+    plt.title("Average Monthly Returns (%)")
+    plt.ylabel("Average % Return")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig("avg_monthly_returns.png")
+    plt.close()
+
+    # Correlation Heatmap
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(corr_matrix, xticklabels=LABELS, yticklabels=LABELS, annot=True, cmap='coolwarm')
+    plt.title("Correlation Heatmap Between Assets")
+    plt.tight_layout()
+    plt.savefig("correlation_heatmap.png")
+    plt.close()
+
+    # Volatility
+    plt.figure(figsize=(8, 6))
+    plt.bar(volatility.keys(), volatility.values(), color='orange')
+    plt.title("Volatility of Monthly Returns (%)")
+    plt.ylabel("Standard Deviation (%)")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig("volatility_bar_chart.png")
+    plt.close()
+
+    # === GRAPH: Gold Price Movement Pie Chart ===
+    # No gold months stored (e.g. a fresh database): a pie of zeros can't be drawn
+    if not change_counts["up"] and not change_counts["down"]:
+        print("No gold price movements stored, skipping gold_up_down_chart.png.")
+        return
+    plt.figure(figsize=(6, 6))
+    labels = ["Down", "Up"]
+    sizes = [change_counts["down"], change_counts["up"]]
+    colors = ["red", "green"]
+    explode = (0.05, 0.05)  # Slightly separate both slices
+
+    plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%',
+            startangle=90, explode=explode, shadow=True)
+    plt.title("Monthly Gold Price Movement")
+    plt.tight_layout()
+    plt.savefig("gold_up_down_chart.png")
+    plt.close()
+
+
+# === FUNCTION: Run the full report ===
+def run_report(output=OUTPUT_FILE, charts=True, windows=()):
+    dates, prices, cpi, gold_changes = analytics.load_prices()
+
+    kernel = analytics.price_kernel(prices, cpi)
+    corr_matrix = analytics.correlation_matrix(np.column_stack([prices, cpi]))
+    average_returns = dict(zip(analytics.ASSETS, analytics.average_returns(kernel["returns"]).tolist()))
+    volatility = dict(zip(analytics.ASSETS, analytics.volatility(kernel["returns"]).tolist()))
+    change_counts = analytics.gold_change_counts(gold_changes)
+    rolling_stats = rolling.rolling_stats(kernel["returns"], windows, stats=("vol",)) if windows else {}
+
+    with open(output, "a") as f:
+        write_ratio_table(f, dates, kernel["real"])
+        write_correlation(f, corr_matrix)
+        write_percentages(f, "Average Monthly Returns (%)", average_returns)
+        write_percentages(f, "Volatility of Monthly Returns (%)", volatility)
+        write_gold_counts(f, change_counts)
+        write_rolling(f, dates, rolling_stats)
+
+    if charts:
+        render_charts(dates, prices, kernel["normalized"], corr_matrix, average_returns, volatility,
+                      change_counts)
+
+
+# === MAIN EXECUTION ===
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write the analysis report and charts.")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Text report to append to")
+    parser.add_argument("--no-charts", action="store_true", help="Skip rendering the PNG charts")
+    parser.add_argument("--rolling", type=int, nargs="+", default=[], metavar="MONTHS",
+                        help="Also report volatility over the last MONTHS months, for each window given")
+    parser.add_argument("--db", help="SQLite file to read (default: $FINANCIAL_DB or financial_data.db)")
+    parser.add_argument("--memory", action="store_true",
+                        help="Load the database into RAM and read the copy; the file is left untouched")
+    args = parser.parse_args()
+    if args.db or args.memory:
+        use_database(args.db, memory=args.memory)
+    run_report(output=args.output, charts=not args.no_charts, windows=args.rolling)
@@ -0,0 +1,3 @@
+# === conftest.py ===
+# Lets tests/ import the top-level modules (analytics, rolling, ...) when
+# pytest is run from the repository root.
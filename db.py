@@ -0,0 +1,124 @@
+# === db.py ===
+# Central SQLite connection factory. Every fetcher and the analysis code
+# open the database through connect() so they all get the same settings:
+#
+#   journal_mode=WAL      readers and the writer no longer block each other
+#   synchronous=NORMAL    no fsync per commit (still safe in WAL mode)
+#   cache_size / mmap     bigger page cache, reads served from the OS page cache
+#   temp_store=MEMORY     sorts and temp indexes stay off disk
+#   busy_timeout          wait for a lock instead of failing with "database is locked"
+#
+# The first connection to each database in a process also applies any
+# pending schema migrations (see schema.py).
+#
+# Where the data lives is one setting, chosen in this order:
+#   use_database(path, memory)   e.g. from fetch_all's --db / --memory flags
+#   FINANCIAL_DB                 environment variable; ":memory:" means in-memory
+#   DB_PATH                      the shared project file
+# In-memory mode copies the file into RAM (VACUUM INTO a memdb database); every
+# connect() in the process then shares that copy, and persist() writes it back.
+
+import os
+import sqlite3
+import threading
+from schema import migrate
+
+DB_PATH = "financial_data.db"
+ENV_VAR = "FINANCIAL_DB"
+MEMORY = ":memory:"
+MEMORY_URI = "file:/financial_data?vfs=memdb"   # Named in-memory database shared by all connections
+
+BUSY_TIMEOUT_MS = 10000            # 10 s
+CACHE_SIZE_KIB = 64 * 1024         # 64 MB page cache (negative cache_size = KiB)
+MMAP_SIZE = 256 * 1024 * 1024      # Map up to 256 MB of the file
+
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+_config = {"path": None, "memory": None}   # None = not set, fall back to the environment
+_memory_anchor = None   # Keeps the in-memory database alive while the process runs
+_memory_lock = threading.Lock()
+
+
+# === Connection that also closes when its `with` block ends ===
+# sqlite3.Connection's own context manager only commits or rolls back.
+class Connection(sqlite3.Connection):
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            self.close()
+
+
+# === Current data-store setting: (on-disk path, in-memory?) ===
+def database_setting():
+    env = os.environ.get(ENV_VAR)
+    path = _config["path"] or (env if env and env != MEMORY else None) or DB_PATH
+    memory = _config["memory"] if _config["memory"] is not None else env == MEMORY
+    return path, memory
+
+
+# === Choose where connect() goes for the rest of the process ===
+# memory=True loads `path` (if it exists) into RAM; the file is not touched
+# again unless persist() is called.
+def use_database(path=None, memory=False):
+    global _memory_anchor
+    _config["path"], _config["memory"] = path, memory
+    if _memory_anchor is not None:
+        _memory_anchor.close()
+        _memory_anchor = None
+        _migrated.discard(MEMORY_URI)
+    if memory:
+        with _memory_lock:
+            _load_into_memory(database_setting()[0])
+
+
+# VACUUM INTO rather than the backup API: a backup copies the file's header
+# as-is, and a file connect() has put in WAL mode cannot be opened from memdb.
+def _load_into_memory(path):
+    global _memory_anchor
+    _memory_anchor = sqlite3.connect(MEMORY_URI, uri=True, check_same_thread=False)
+    if os.path.exists(path):
+        source = sqlite3.connect(path)
+        try:
+            source.execute("VACUUM INTO ?", (MEMORY_URI,))
+        finally:
+            source.close()
+
+
+# === Copy the in-memory database back to disk (path defaults to the setting) ===
+def persist(path=None):
+    if _memory_anchor is None:
+        raise RuntimeError("persist() needs an in-memory database; call use_database(memory=True)")
+    target = sqlite3.connect(path or database_setting()[0])
+    try:
+        _memory_anchor.backup(target)
+    finally:
+        target.close()
+
+
+# === Open a tuned connection ===
+# Use as `with connect() as conn:` - commits on success, rolls back on error,
+# and closes the connection either way. path=None follows the data-store setting.
+def connect(path=None):
+    uri = False
+    if path is None:
+        path, memory = database_setting()
+        if memory:
+            with _memory_lock:
+                if _memory_anchor is None:
+                    _load_into_memory(path)   # FINANCIAL_DB=:memory:
+            path, uri = MEMORY_URI, True
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, factory=Connection, uri=uri)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+
+    with _migrate_lock:
+        if path not in _migrated:
+            migrate(conn)
+            _migrated.add(path)
+    return conn
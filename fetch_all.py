@@ -1,30 +1,145 @@
 # === IMPORT DATA FETCHING FUNCTIONS ===
 # These functions retrieve and store data into the SQLite database.
-from fetch_bitcoin import fetch_and_store_bitcoin             # Fetches and stores Bitcoin price data
-from fetch_cpi_oil import fetch_and_store_cpi, fetch_and_store_oil  # Fetches and stores CPI and Oil data
-from fetch_sp500_gld import fetch_and_store_gold, fetch_and_store_sp500  # Fetches and stores S&P 500 and Gold data
-import sqlite3
+from fetch_fred import fetch_and_store_fred                   # Fetches and stores CPI, Oil and other FRED series
+from fetch_sp500_gld import fetch_and_store_gold             # Fetches and stores Gold data
+from fetch_tickers import fetch_and_store_tickers             # Fetches and stores Bitcoin and S&P 500 in one download
+from db import connect, database_setting, persist, use_database
+from fetch_modes import MODES
+from snapshot import load_snapshot
+from writer import Writer
+from functools import partial
+import argparse
+import threading
+import time
+
+# === SOURCES TO REFRESH ===
+# Each entry is (name, function). Every source runs on its own thread.
+SOURCES = [
+    ("tickers", fetch_and_store_tickers),   # BTC-USD and SPY share one yf.download
+    ("gold", fetch_and_store_gold),
+    ("fred", fetch_and_store_fred),         # CPI and oil downloaded concurrently
+]
+
+# Seconds each source is allowed to run before it is reported as timed out
+SOURCE_TIMEOUT = 120
+
+# Incremental runs skip series refreshed less than this many seconds ago
+# (per series_meta.last_fetch_at), without a network call
+FRESH_TTL = 6 * 3600
+
+
+# === FUNCTION: Run a single source and record how it went ===
+# setdefault: a source that finishes after it was reported as timed out must
+# not rewrite the summary that was already returned.
+def run_source(name, func, results):
+    start = time.perf_counter()
+    try:
+        func()
+        results.setdefault(name, ("ok", time.perf_counter() - start, ""))
+    except Exception as e:
+        # One failing source must not stop the others
+        results.setdefault(name, ("failed", time.perf_counter() - start, f"{type(e).__name__}: {e}"))
+
+
+# === FUNCTION: Run every source at once and print one summary ===
+# mode/start/end are passed to every fetcher (see fetch_modes.py).
+# provider_monthly=True asks every provider for monthly data instead of daily;
+# it is stored under separate series IDs (see store.aggregate_series_id).
+# Sources only read and download in parallel; all their writes go through one
+# Writer thread (see writer.py), so they never contend for the database lock.
+# max_age: skip series refreshed less than this many seconds ago. Defaults to
+# FRESH_TTL in incremental mode and to never skipping otherwise; 0 disables it.
+def fetch_all_sources(sources=SOURCES, timeout=SOURCE_TIMEOUT, mode="chunk", start=None, end=None,
+                      provider_monthly=False, max_age=None):
+    results = {}
+    threads = []
+    start_time = time.perf_counter()
+    writer = Writer().start()
+    if max_age is None and mode == "incremental":
+        max_age = FRESH_TTL
+
+    # Daemon threads so a hung source cannot keep the script alive
+    for name, func in sources:
+        job = partial(func, mode=mode, start=start, end=end, provider_monthly=provider_monthly,
+                      writer=writer, max_age=max_age)
+        t = threading.Thread(target=run_source, args=(name, job, results),
+                             name=f"fetch-{name}", daemon=True)
+        t.start()
+        threads.append((name, t))
+
+    # Every source started at the same time, so each one gets the same deadline
+    deadline = start_time + timeout
+    for name, t in threads:
+        t.join(max(0, deadline - time.perf_counter()))
+        if t.is_alive():
+            results.setdefault(name, ("timeout", time.perf_counter() - start_time,
+                                      f"still running after {timeout}s"))
+
+    # Wait for every queued write to be committed
+    writer.close()
+    for op_name, error in writer.errors:
+        source = op_name.split()[0]
+        if source in results and results[source][0] == "ok":
+            results[source] = ("failed", results[source][1], f"write failed: {error}")
+
+    total = time.perf_counter() - start_time
+
+    print("\n=== Refresh Summary ===")
+    for name, _ in sources:
+        status, elapsed, detail = results[name]
+        line = f"{name:<10} {status:<8} {elapsed:6.2f}s"
+        if detail:
+            line += f"  {detail}"
+        print(line)
+    print(f"Writes: {writer.applied} applied in {writer.commits} transaction(s)")
+    if writer.dropped:
+        print(f"Writes dropped after close: {len(writer.dropped)}")
+    print(f"Total wall-clock time: {total:.2f}s")
+
+    return results
+
+
 # === MAIN EXECUTION BLOCK ===
 # When the script is run directly, fetch data from all sources.
 if __name__ == '__main__':
-    with sqlite3.connect("financial_data.db") as conn:
-            c = conn.cursor()
-            c.execute("""
-                CREATE TABLE IF NOT EXISTS Combined_Prices (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date TEXT UNIQUE,
-                    btc_price REAL,
-                    sp500_price REAL,
-                    gold_open REAL,
-                    gold_close REAL,
-                    gold_change INTEGER,  -- FK to Gold_Change.id
-                    oil_price REAL,
-                    cpi_value REAL
-                );
-            """)
-            conn.commit()
-    fetch_and_store_bitcoin()     # Insert next 25 rows of Bitcoin data (up to 100 max)
-    fetch_and_store_sp500()       # Insert next 25 rows of S&P 500 data
-    fetch_and_store_gold()        # Insert next 25 rows of Gold data
-    fetch_and_store_cpi()         # Insert next 25 rows of CPI data
-    fetch_and_store_oil()         # Insert next 25 rows of Oil price data
+    parser = argparse.ArgumentParser(description="Fetch and store data from every source.")
+    parser.add_argument("--mode", choices=MODES, default="chunk",
+                        help="chunk: next 25 months per source (max 100); "
+                             "backfill: whole start..end range in one request; "
+                             "incremental: each series' last stored month onward")
+    parser.add_argument("--start", help="Backfill start date (YYYY-MM-DD or YYYY-MM)")
+    parser.add_argument("--end", help="Backfill end date, exclusive (YYYY-MM-DD or YYYY-MM)")
+    parser.add_argument("--provider-monthly", action="store_true",
+                        help="Request monthly data from each provider (yfinance 1mo bars, "
+                             "FRED frequency=m, Alpha Vantage TIME_SERIES_MONTHLY) instead of daily; "
+                             "stored as separate series such as SPY.close.1mo and DCOILWTICO.avg")
+    parser.add_argument("--timeout", type=float, default=SOURCE_TIMEOUT,
+                        help="Seconds each source may run before it is reported as timed out")
+    parser.add_argument("--max-age", type=float,
+                        help="Skip series refreshed less than this many seconds ago "
+                             f"(default: {FRESH_TTL} in incremental mode, otherwise never; 0 = never)")
+    parser.add_argument("--db", help="SQLite file to use (default: $FINANCIAL_DB or financial_data.db)")
+    parser.add_argument("--memory", action="store_true",
+                        help="Load the database into RAM and work on the copy; the file is left untouched")
+    parser.add_argument("--persist", action="store_true",
+                        help="With --memory, write the in-memory database back to the file at the end")
+    args = parser.parse_args()
+    if args.persist and not args.memory:
+        parser.error("--persist only applies with --memory")
+
+    if args.db or args.memory:
+        use_database(args.db, memory=args.memory)
+
+    # Bring the schema up to date once, before any fetcher starts
+    with connect():
+        pass
+    # All sources run at the same time
+    fetch_all_sources(timeout=args.timeout, mode=args.mode, start=args.start, end=args.end,
+                      provider_monthly=args.provider_monthly, max_age=args.max_age)
+    # Rebuild the analytics snapshot of the file if this run changed it, so the
+    # next analysis run maps it directly. A --memory run without --persist
+    # leaves the file as it was, so its snapshot stays valid.
+    if args.memory and args.persist:
+        persist()
+    if not args.memory or args.persist:
+        load_snapshot(path=database_setting()[0])
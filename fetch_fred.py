@@ -0,0 +1,194 @@
+# === fetch_fred.py ===
+# Generic FRED ingester: downloads any list of series concurrently over the
+# shared pooled session and stores them all in one transaction. Each FRED
+# series is stored under its own ID, every observation in daily_observations
+# and the first of each month in observations. provider_monthly values are
+# FRED's own monthly aggregates and go to a separate series, e.g. DCOILWTICO.avg.
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from db import connect
+from fetch_modes import BASE_START, CHUNK_SIZE, MAX_ROWS, get_watermark, resolve_window
+from get_api_key import get_api_key
+from http_cache import cached_get_json
+from periods import day_key, day_keys, month_keys, month_label
+from resample import select_per_period
+from store import (aggregate_series_id, count_observations, first_observation_per_month, is_fresh,
+                   payload_hash, register_series, update_series_meta, upsert_daily_observations,
+                   upsert_observations)
+from writer import apply_write
+
+FRED_API_KEY = get_api_key(2)
+FRED_URL = "https://api.stlouisfed.org/fred/series/observations"
+
+# Series refreshed by default: series_id -> description. Any other FRED ID
+# can be passed to fetch_and_store_fred and is added to the catalog.
+FRED_SERIES = {
+    "CPIAUCSL": "Consumer Price Index, all urban",
+    "DCOILWTICO": "WTI crude oil price",
+}
+
+# How FRED should collapse each series to monthly when provider_monthly=True.
+# Monthly series are unaffected; daily oil becomes the monthly average price.
+# The result is stored as <series_id>.<method> (see stored_series_id).
+FRED_AGGREGATION = {
+    "CPIAUCSL": "avg",
+    "DCOILWTICO": "avg",
+}
+
+MAX_WORKERS = 8   # Concurrent FRED downloads (FRED allows 120 requests/minute)
+
+
+# === Series ID the values of a FRED series are stored under ===
+def stored_series_id(series_id, provider_monthly=False):
+    if provider_monthly:
+        return aggregate_series_id(series_id, FRED_AGGREGATION.get(series_id, "avg"))
+    return series_id
+
+
+# === Description for the catalog ===
+def series_description(series_id, provider_monthly=False):
+    description = FRED_SERIES.get(series_id)
+    if provider_monthly:
+        method = FRED_AGGREGATION.get(series_id, "avg")
+        return f"{description or series_id}, FRED monthly {method}"
+    return description
+
+
+# === Build FRED request params for the given fetch mode ===
+# provider_monthly=True asks FRED for one aggregated observation per month.
+def fred_window_params(series_id, mode, current_count, start=None, end=None, last_period=None,
+                       provider_monthly=False):
+    params = {
+        "series_id": series_id,
+        "api_key": FRED_API_KEY,
+        "file_type": "json",
+        "observation_start": BASE_START.strftime("%Y-%m-%d")
+    }
+    if mode != "chunk":
+        window_start, window_end, _ = resolve_window(mode, current_count, start, end, last_period)
+        params["observation_start"] = window_start.strftime("%Y-%m-%d")
+        # FRED's observation_end is inclusive, our window end is exclusive
+        params["observation_end"] = (window_end - timedelta(days=1)).strftime("%Y-%m-%d")
+    if provider_monthly:
+        params["frequency"] = "m"
+        params["aggregation_method"] = FRED_AGGREGATION.get(series_id, "avg")
+    return params
+
+
+# === Parse FRED observations into (dates, values) arrays ===
+# FRED marks missing values with "."; they become NaN and are skipped later.
+def parse_observations(raw):
+    dates = np.array([obs["date"] for obs in raw], dtype="datetime64[D]")
+    values = np.array([obs["value"] for obs in raw], dtype=object)
+    values[values == "."] = "nan"
+    return dates, values.astype("float64")
+
+
+# === Pick which months to insert ===
+# Chunk mode takes the next 25 months after what is stored; backfill keeps them all.
+def select_chunk(rows, mode, current_count):
+    if mode == "chunk":
+        return rows[current_count:current_count + CHUNK_SIZE]
+    return rows
+
+
+# === FUNCTION: Fetch and store a list of FRED series ===
+# Parameters: see fetch_modes.py.
+def fetch_and_store_fred(series_ids=None, mode="chunk", start=None, end=None, provider_monthly=False,
+                         writer=None, max_age=None):
+    series_ids = list(series_ids or FRED_SERIES)
+
+    with connect() as conn:
+        c = conn.cursor()
+
+        # Work out each series' request
+        requests_by_id = {}
+        counts = {}
+        for series_id in series_ids:
+            stored_id = stored_series_id(series_id, provider_monthly)
+            if is_fresh(c, stored_id, max_age):
+                print(f"{stored_id} was refreshed less than {max_age:.0f}s ago, skipping.")
+                continue
+            counts[series_id] = count_observations(c, stored_id)
+
+            if mode == "chunk" and counts[series_id] >= MAX_ROWS:
+                print(f"100 {stored_id} entries already stored.")
+                continue
+
+            last_period = get_watermark(c, stored_id) if mode == "incremental" else None
+            params = fred_window_params(series_id, mode, counts[series_id], start, end, last_period,
+                                        provider_monthly)
+            if params["observation_start"] > params.get("observation_end", "9999"):
+                print(f"{series_id} already up to date (last stored: {month_label(last_period)}).")
+                continue
+            requests_by_id[series_id] = params
+
+    if not requests_by_id:
+        return
+
+    # Download every series at once over the shared session
+    print(f"Fetching FRED series ({mode}): {', '.join(requests_by_id)}")
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(requests_by_id))) as pool:
+        futures = {sid: pool.submit(cached_get_json, FRED_URL, params)
+                   for sid, params in requests_by_id.items()}
+        responses = {}
+        for sid, future in futures.items():
+            # A failing series is reported and skipped; the others are still stored
+            try:
+                responses[sid] = future.result()
+            except Exception as e:
+                print(f"Failed to fetch {sid}: {type(e).__name__}: {e}")
+
+    # Every observation returned goes into the daily tier; the first one of
+    # each month is derived from there. provider_monthly responses are
+    # already one aggregated value per month and skip the daily tier.
+    prepared = []
+    for series_id, response in responses.items():
+        raw = response.get("observations", [])
+        if not raw:
+            print(f"No {series_id} data returned.")
+            continue
+        dates, values = parse_observations(raw)
+        if provider_monthly:
+            periods, values = select_per_period(dates, values, how="first")
+            prepared.append((series_id, None, list(zip(month_keys(periods).tolist(), values.tolist())),
+                             payload_hash(response)))
+        else:
+            daily = list(zip([series_id] * len(dates), day_keys(dates).tolist(), values.tolist()))
+            prepared.append((series_id, daily, None, payload_hash(response)))
+
+    def write(c):
+        rows = []
+        inserted = {}
+        for series_id, daily, monthly, _ in prepared:
+            if daily is not None:
+                upsert_daily_observations(c, daily)
+                params = requests_by_id[series_id]
+                # observation_end is inclusive; no end means everything returned
+                observation_end = params.get("observation_end")
+                monthly = first_observation_per_month(c, series_id, day_key(params["observation_start"]),
+                                                      day_key(observation_end) + 1 if observation_end else None)
+            stored_id = stored_series_id(series_id, provider_monthly)
+            chunk = select_chunk(monthly, mode, counts[series_id])
+            rows.extend((stored_id, date, value) for date, value in chunk)
+            inserted[stored_id] = len(chunk)
+
+            register_series(c, stored_id, "fred", series_id, "value",
+                            series_description(series_id, provider_monthly))
+
+        # One statement, one transaction for every series and its metadata
+        upsert_observations(c, rows)
+        for series_id, _, _, digest in prepared:
+            update_series_meta(c, stored_series_id(series_id, provider_monthly), "fred", digest)
+        # Totals come from series_meta: re-fetched months are updated, not added
+        for stored_id, count in inserted.items():
+            print(f"Inserted {count} {stored_id} entries. Total: {count_observations(c, stored_id)}")
+
+    apply_write(f"fred {', '.join(requests_by_id)}", write, writer)
+
+
+# === MAIN EXECUTION ===
+if __name__ == '__main__':
+    fetch_and_store_fred()
@@ -0,0 +1,85 @@
+# === fetch_modes.py ===
+# Shared date-window logic for every fetcher.
+#
+# Modes:
+#   "chunk"       - original behaviour: next 25 months per run, capped at 100 rows
+#   "backfill"    - whole requested range in one request and one transaction
+#   "incremental" - from the series' high-water mark onward; the last stored
+#                   month is fetched again, since it may have been incomplete
+#
+# Every fetch_and_store_* function takes the same keyword arguments:
+#   mode              one of MODES above (default "chunk")
+#   start, end        backfill/incremental window, "YYYY-MM[-DD]"; end is exclusive
+#   provider_monthly  take the provider's own monthly aggregate; stored as separate
+#                     series (see store.aggregate_series_id)
+#   writer            a writer.Writer to queue the database work on (None = write directly)
+#   max_age           skip series refreshed less than this many seconds ago (None = never skip)
+
+from datetime import date, datetime, time
+from dateutil.relativedelta import relativedelta
+from periods import month_start
+from store import last_period as stored_last_period
+
+BASE_START = datetime(2016, 7, 1)   # First month of the project's history
+CHUNK_SIZE = 25                     # Rows added per run in chunk mode
+MAX_ROWS = 100                      # Row cap in chunk mode
+
+MODES = ("chunk", "backfill", "incremental")
+
+
+# === Parse a user-supplied date ("YYYY-MM-DD", "YYYY-MM" or datetime) ===
+def parse_date(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    for fmt in ("%Y-%m-%d", "%Y-%m"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date {value!r}, expected YYYY-MM-DD or YYYY-MM")
+
+
+# === Default window end: tomorrow at midnight, so today's data is included ===
+# Day-aligned so every fetcher in one run gets the identical window.
+def default_end():
+    return datetime.combine(date.today(), time()) + relativedelta(days=1)
+
+
+# === Work out the [start, end) window and row limit for a fetch ===
+# Returns (start, end, limit). limit is None when every month in the window is kept.
+# last_period is the series' high-water mark (month key), used by incremental mode.
+def resolve_window(mode, current_count, start=None, end=None, last_period=None):
+    if mode == "chunk":
+        chunk_index = current_count // CHUNK_SIZE
+        chunk_start = BASE_START + relativedelta(months=chunk_index * CHUNK_SIZE)
+        chunk_end = chunk_start + relativedelta(months=CHUNK_SIZE)
+        return chunk_start, chunk_end, CHUNK_SIZE
+
+    if mode == "backfill":
+        window_start = parse_date(start) or BASE_START
+        # End is exclusive
+        window_end = parse_date(end) or default_end()
+        if window_end <= window_start:
+            raise ValueError(f"Backfill end {window_end.date()} is not after start {window_start.date()}")
+        return window_start, window_end, None
+
+    if mode == "incremental":
+        # Start at the last month stored: it was probably fetched before the month
+        # ended, so its values are refreshed (unchanged rows are not rewritten)
+        if last_period is not None:
+            window_start = datetime.combine(month_start(last_period), time())
+        else:
+            window_start = parse_date(start) or BASE_START
+        window_end = parse_date(end) or default_end()
+        return window_start, window_end, None
+
+    raise ValueError(f"Unknown fetch mode {mode!r}, expected one of {MODES}")
+
+
+# === High-water mark ===
+# The last stored period of every series lives in series_meta (see schema.py),
+# kept in step with the data by store.update_series_meta.
+
+# Return the last stored month key for a series, or None if nothing is stored.
+def get_watermark(c, series):
+    return stored_last_period(c, series)
@@ -10,160 +10,168 @@
 
 # === File: fetch_sp500_gold.py ===
 
-import yfinance as yf
-import sqlite3
-import requests
+import numpy as np
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
+from db import connect
+from fetch_modes import MAX_ROWS, get_watermark, resolve_window
+from fetch_tickers import fetch_and_store_tickers
 from get_api_key import get_api_key
+from http_cache import cached_get_json
+from rate_limit import QuotaScheduler, throttle_message
+from periods import day_key, month_keys, month_label
+from resample import select_per_period
+from store import (aggregate_series_id, count_observations, first_bar_per_month, is_fresh, payload_hash,
+                   register_series, update_series_meta, upsert_daily_bars, upsert_observations)
+from writer import apply_write
 
 # Load your AlphaVantage API key (for gold prices)
 ALPHA_API_KEY = get_api_key(1)
 
-# === Function: Fetch and store S&P 500 (SPY ETF) data ===
+# Alpha Vantage "compact" output holds the latest 100 trading days (~4.5 months).
+# Windows starting within this many days of today can use it instead of "full".
+COMPACT_MAX_AGE_DAYS = 130
 
-def fetch_and_store_sp500():
-    with sqlite3.connect("financial_data.db") as conn:
-        c = conn.cursor()
 
-       
-        # Count how many SP500 prices are already inserted
-        c.execute("SELECT COUNT(sp500_price) FROM Combined_Prices WHERE sp500_price IS NOT NULL")
-        current_count = c.fetchone()[0]
+# Gold series: first trading day open/close and direction (see schema.LEGACY_SERIES)
+GOLD_SERIES = ("GLD.open", "GLD.close", "GLD.change")
+MONTHLY_BARS = "1mo"   # Suffix of the series built from TIME_SERIES_MONTHLY bars
 
-        if current_count >= 100:
-            print("100 SP500 data points already stored.")
-            return
+# === Gold series IDs; provider_monthly values are kept apart (GLD.open.1mo, ...) ===
+def gold_series(provider_monthly=False):
+    if provider_monthly:
+        return tuple(aggregate_series_id(series_id, MONTHLY_BARS) for series_id in GOLD_SERIES)
+    return GOLD_SERIES
 
-        # Determine date chunk to fetch
-        chunk_index = current_count // 25
-        chunk_size = 25
-        base_start = datetime(2016, 7, 1)
-        chunk_start = base_start + relativedelta(months=chunk_index * chunk_size)
-        chunk_end = chunk_start + relativedelta(months=chunk_size)
-
-        print(f"Fetching SP500 chunk {chunk_index + 1}: {chunk_start.date()} to {chunk_end.date()}")
-
-        # Fetch daily SP500 (SPY) data for the chunk
-        data = yf.download(
-            "SPY",
-            start=chunk_start.strftime("%Y-%m-%d"),
-            end=chunk_end.strftime("%Y-%m-%d"),
-            interval="1d",
-            progress=False,
-            auto_adjust=False
-        )
-
-        if data is None or data.empty:
-            print("No SPY data returned from yfinance.")
-            return
+# === Pick the smallest Alpha Vantage outputsize that covers the window ===
+def alpha_outputsize(window_start):
+    if (datetime.now() - window_start).days <= COMPACT_MAX_AGE_DAYS:
+        return "compact"
+    return "full"
 
-        # Pick first entry for each month
-        monthly_data = {}
-        for dt, row in data.iterrows():
-            dt_obj = dt.to_pydatetime()
-            ym_key = (dt_obj.year, dt_obj.month)
-            if ym_key not in monthly_data:
-                try:
-                    price = float(row["Close"].item())
-                    monthly_data[ym_key] = (dt_obj, price)
-                except:
-                    continue
-            if len(monthly_data) == 25:
-                break
-
-        inserted = 0
-        for (_, _), (dt, price) in sorted(monthly_data.items()):
-            date_str = dt.strftime("%Y-%m")
-            c.execute("""
-                INSERT INTO Combined_Prices (date, sp500_price)
-                VALUES (?, ?)
-                ON CONFLICT(date) DO UPDATE SET sp500_price = excluded.sp500_price
-            """, (date_str, price))
-            inserted += 1
-
-        conn.commit()
-        print(f"Inserted {inserted} SP500 entries. Total should now be {current_count + inserted}.")
+# === (open, high, low, close, volume) of one Alpha Vantage daily entry ===
+def alpha_bar(entry):
+    volume = entry.get("5. volume")
+    return (float(entry.get("1. open", "nan")), float(entry.get("2. high", "nan")),
+            float(entry.get("3. low", "nan")), float(entry.get("4. close", "nan")),
+            int(volume) if volume is not None else None)
+
+# === Function: Fetch and store S&P 500 (SPY ETF) data ===
+# Parameters: see fetch_modes.py.
+def fetch_and_store_sp500(mode="chunk", start=None, end=None, provider_monthly=False, writer=None,
+                          max_age=None):
+    # Uses the shared ticker fetcher; see fetch_tickers.py
+    fetch_and_store_tickers(["SPY"], mode=mode, start=start, end=end,
+                            provider_monthly=provider_monthly, writer=writer, max_age=max_age)
 
 # === Function: Fetch and store Gold (GLD) data ===
-def fetch_and_store_gold():
-    with sqlite3.connect("financial_data.db") as conn:
+# Parameters: see fetch_modes.py.
+# provider_monthly=True uses TIME_SERIES_MONTHLY: open/close become the month's
+# first open and last close, so gold_change is the month's direction. Those are
+# stored as GLD.open.1mo, GLD.close.1mo and GLD.change.1mo.
+def fetch_and_store_gold(mode="chunk", start=None, end=None, provider_monthly=False, writer=None,
+                         max_age=None):
+    series_ids = gold_series(provider_monthly)
+    with connect() as conn:
         c = conn.cursor()
 
+        if is_fresh(c, series_ids[0], max_age):
+            print(f"Gold was refreshed less than {max_age:.0f}s ago, skipping.")
+            return
 
-        # Create Gold_Change table (0 = down, 1 = up)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS Gold_Change (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                label string
-            )
-        """)
-        c.execute("INSERT OR IGNORE INTO Gold_Change (id, label) VALUES (0, 'down')")
-        c.execute("INSERT OR IGNORE INTO Gold_Change (id, label) VALUES (1, 'up')")
-
-        c.execute("SELECT COUNT(gold_open) FROM Combined_Prices WHERE gold_open IS NOT NULL")
-        current_count = c.fetchone()[0]
+        current_count = count_observations(c, series_ids[0])
 
-        if current_count >= 100:
+        if mode == "chunk" and current_count >= MAX_ROWS:
             print("100 Gold entries already exist.")
             return
 
-        chunk_index = current_count // 25
-        base_start = datetime(2016, 7, 1)
-        chunk_start = base_start + relativedelta(months=chunk_index * 25)
-        chunk_end = chunk_start + relativedelta(months=25)
+        last_period = get_watermark(c, series_ids[0]) if mode == "incremental" else None
+        chunk_start, chunk_end, limit = resolve_window(mode, current_count, start, end, last_period)
+        if chunk_start >= chunk_end:
+            print(f"Gold already up to date (last stored: {month_label(last_period)}).")
+            return
 
-        print(f"Fetching Gold chunk {chunk_index + 1}: {chunk_start.date()} to {chunk_end.date()}")
+    print(f"Fetching Gold ({mode}): {chunk_start.date()} to {chunk_end.date()}")
 
-        url = "https://www.alphavantage.co/query"
+    url = "https://www.alphavantage.co/query"
+    if provider_monthly:
+        # Monthly bars: the whole history is only a few hundred rows
+        series_key = "Monthly Time Series"
+        params = {
+            "function": "TIME_SERIES_MONTHLY",
+            "symbol": "GLD",
+            "apikey": ALPHA_API_KEY
+        }
+    else:
+        series_key = "Time Series (Daily)"
         params = {
             "function": "TIME_SERIES_DAILY",
             "symbol": "GLD",
             "apikey": ALPHA_API_KEY,
-            "outputsize": "full"
+            # Only the full history reaches back past the last ~100 trading days
+            "outputsize": alpha_outputsize(chunk_start) if mode == "incremental" else "full"
         }
 
-        response = requests.get(url, params=params).json()
-        time_series = response.get("Time Series (Daily)", {})
-        if not time_series:
-            print("No Gold data returned.")
-            return
-
-        monthly_data = {}
-        for date_str in sorted(time_series.keys()):
-            dt = datetime.strptime(date_str, "%Y-%m-%d")
-            if dt < chunk_start or dt >= chunk_end:
-                continue
-
-            ym_key = (dt.year, dt.month)
-            if ym_key not in monthly_data:
-                try:
-                    entry = time_series[date_str]
-                    open_price = float(entry["1. open"])
-                    close_price = float(entry["4. close"])
-                    monthly_data[ym_key] = (dt, open_price, close_price)
-                except:
-                    continue
-            if len(monthly_data) == 25:
-                break
-
-        inserted = 0
-        for (_, _), (dt, open_price, close_price) in sorted(monthly_data.items()):
-            direction = 1 if close_price > open_price else 0
-
-            date_str = dt.strftime("%Y-%m")
-            c.execute("""
-            INSERT INTO Combined_Prices (date, gold_open, gold_close, gold_change)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(date) DO UPDATE SET
-                gold_open = excluded.gold_open,
-                gold_close = excluded.gold_close,
-                gold_change = excluded.gold_change
-        """, (date_str, open_price, close_price, direction))
-            inserted += 1
-
-        conn.commit()
-        print(f"Inserted {inserted} new Gold entries. Total now: {current_count + inserted}.")
+    # Queue through the Alpha Vantage scheduler so calls respect the 5/minute
+    # and 25/day limits; value is the number of months this request can add.
+    scheduler = QuotaScheduler("alphavantage")
+    scheduler.submit("GLD", params, value=limit or (chunk_end - chunk_start).days // 30)
+    responses = dict(scheduler.run(lambda p: cached_get_json(url, p)))
+    if "GLD" not in responses:
+        return
+
+    response = responses["GLD"]
+    throttled = throttle_message("alphavantage", response)
+    if throttled:
+        print(f"Alpha Vantage throttled the Gold request: {throttled}")
+        return
+
+    time_series = response.get(series_key, {})
+    if not time_series:
+        print("No Gold data returned.")
+        return
+
+    if provider_monthly:
+        # Monthly bars: open/close of each month in the window
+        dates = np.array(list(time_series.keys()), dtype="datetime64[D]")
+        prices = np.array([(entry.get("1. open", "nan"), entry.get("4. close", "nan"))
+                           for entry in time_series.values()], dtype="float64")
+        in_window = (dates >= np.datetime64(chunk_start, "D")) & (dates < np.datetime64(chunk_end, "D"))
+        periods, monthly_prices = select_per_period(dates[in_window], prices[in_window], how="first",
+                                                    limit=limit)
+        bars = None
+    else:
+        bars = [("GLD", day_key(day), *alpha_bar(entry)) for day, entry in time_series.items()]
+
+    def write(c):
+        if bars is None:
+            labels, prices = month_keys(periods).tolist(), monthly_prices
+        else:
+            # Keep every daily bar returned, then take the open/close of the
+            # first trading day in each month of the window from the daily tier
+            upsert_daily_bars(c, bars)
+            monthly = first_bar_per_month(c, "GLD", ["open", "close"], day_key(chunk_start),
+                                          day_key(chunk_end))[:limit]
+            labels = [row[0] for row in monthly]
+            prices = np.array([row[1:] for row in monthly], dtype="float64").reshape(-1, 2)
+
+        open_prices, close_prices = prices[:, 0], prices[:, 1]
+        directions = (close_prices > open_prices).astype(int)   # 1 = up, 0 = down
+        rows = []
+        for series_id, values in zip(series_ids, (open_prices, close_prices, directions)):
+            rows.extend(zip([series_id] * len(labels), labels, values.tolist()))
+        if provider_monthly:
+            for series_id, field in zip(series_ids, ("open", "close", "change")):
+                register_series(c, series_id, "alphavantage", "GLD", field, f"Gold ETF monthly bar {field}")
+
+        upsert_observations(c, rows)
+        inserted = len(labels)
+        digest = payload_hash(response)
+        for series_id in series_ids:
+            update_series_meta(c, series_id, "alphavantage", digest)
+        # Total from series_meta: re-fetched months are updated, not added
+        print(f"Inserted {inserted} new Gold entries. Total now: {count_observations(c, series_ids[0])}.")
+
+    apply_write("gold", write, writer)
 
 # === MAIN EXECUTION ===
 # Run both fetch functions when this file is executed directly
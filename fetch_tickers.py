@@ -0,0 +1,176 @@
+# === fetch_tickers.py ===
+# Fetches monthly prices for any number of yfinance tickers (equities, ETFs,
+# crypto) with ONE threaded yf.download call, keeps the daily OHLCV bars in the
+# daily tier, then upserts every ticker's monthly observations in a single pass.
+#
+# provider_monthly=True downloads monthly bars (interval="1mo") instead of daily
+# ones. A monthly bar's Close is the month's LAST close, not the first trading
+# day's, so those values go to separate series (SPY.close.1mo, BTC-USD.open.1mo;
+# see store.aggregate_series_id).
+
+import numpy as np
+import yfinance as yf
+import pandas as pd
+from db import connect
+from fetch_modes import MAX_ROWS, get_watermark, resolve_window
+from periods import day_key, day_keys, month_keys, month_label
+from resample import select_per_period
+from store import (aggregate_series_id, count_observations, first_bar_per_month, is_fresh, payload_hash,
+                   register_series, update_series_meta, upsert_daily_bars, upsert_observations)
+from writer import apply_write
+
+# ticker: (series_id, price field taken from the first trading day of each month)
+TICKERS = {
+    "BTC-USD": ("BTC-USD.open", "Open"),
+    "SPY": ("SPY.close", "Close"),
+}
+
+
+MONTHLY_BARS = "1mo"   # Suffix of series built from provider monthly bars
+
+# === Series and price field for a ticker (unlisted tickers store their Close) ===
+# provider_monthly=True names the separate series filled from monthly bars.
+def ticker_series(ticker, provider_monthly=False):
+    series_id, field = TICKERS.get(ticker, (f"{ticker}.close", "Close"))
+    if provider_monthly:
+        series_id = aggregate_series_id(series_id, MONTHLY_BARS)
+    return series_id, field
+
+
+# === Split a yf.download result into one frame per ticker ===
+def split_by_ticker(data, tickers):
+    frames = {}
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(0):
+                continue
+            frame = data[ticker]
+        else:
+            frame = data   # Single ticker without a ticker level
+        frames[ticker] = frame.dropna(how="all")
+    return frames
+
+
+# === (symbol, day, open, high, low, close, volume) rows for the daily tier ===
+# Days without a close (e.g. SPY on weekends in a mixed BTC/SPY download) are dropped.
+def daily_bar_rows(ticker, frame, index):
+    columns = [frame[col].to_numpy(dtype="float64") if col in frame else np.full(len(frame), np.nan)
+               for col in ("Open", "High", "Low", "Close", "Volume")]
+    has_close = ~np.isnan(columns[3])
+    days = day_keys(index)[has_close]
+    opens, highs, lows, closes, volumes = (np.where(np.isnan(col), None, col)[has_close].tolist()
+                                           for col in columns)
+    return [(ticker, day, o, h, l, cl, None if v is None else int(v))
+            for day, o, h, l, cl, v in zip(days.tolist(), opens, highs, lows, closes, volumes)]
+
+
+# === Payload hash of one ticker's downloaded frame ===
+def frame_hash(frame):
+    return payload_hash(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+
+
+# === FUNCTION: Fetch and store monthly prices for a list of tickers ===
+# Parameters: see fetch_modes.py.
+def fetch_and_store_tickers(tickers=None, mode="chunk", start=None, end=None, provider_monthly=False,
+                            writer=None, max_age=None):
+    tickers = list(tickers or TICKERS)
+
+    with connect() as conn:
+        c = conn.cursor()
+
+        # Work out each ticker's window
+        windows = {}
+        counts = {}
+        for ticker in tickers:
+            series_id, _ = ticker_series(ticker, provider_monthly)
+            if is_fresh(c, series_id, max_age):
+                print(f"{ticker} was refreshed less than {max_age:.0f}s ago, skipping.")
+                continue
+            counts[ticker] = count_observations(c, series_id)
+
+            if mode == "chunk" and counts[ticker] >= MAX_ROWS:
+                print(f"100 {ticker} data points already stored.")
+                continue
+
+            last_period = get_watermark(c, series_id) if mode == "incremental" else None
+            window = resolve_window(mode, counts[ticker], start, end, last_period)
+            if window[0] >= window[1]:
+                print(f"{ticker} already up to date (last stored: {month_label(last_period)}).")
+                continue
+            windows[ticker] = window
+
+    if not windows:
+        return
+
+    # One threaded download covering every ticker's window
+    group = list(windows)
+    download_start = min(w[0] for w in windows.values())
+    download_end = max(w[1] for w in windows.values())
+    interval = "1mo" if provider_monthly else "1d"
+    print(f"Fetching {', '.join(group)} ({mode}, {interval}): {download_start.date()} to {download_end.date()}")
+    data = yf.download(
+        group,
+        start=download_start.strftime("%Y-%m-%d"),
+        end=download_end.strftime("%Y-%m-%d"),
+        interval=interval,
+        group_by="ticker",
+        threads=True,
+        progress=False,
+        auto_adjust=False
+    )
+    if data is None or data.empty:
+        print(f"No data returned from yfinance for {', '.join(group)}.")
+        return
+
+    # Every daily bar returned goes into the daily tier; the first trading
+    # day of each month in the ticker's own window is then derived from it.
+    # Monthly bars (provider_monthly) have no daily rows to keep.
+    prepared = []
+    for ticker, frame in split_by_ticker(data, group).items():
+        series_id, field = ticker_series(ticker, provider_monthly)
+        if field not in frame:
+            continue
+        window_start, window_end, limit = windows[ticker]
+        index = frame.index.tz_localize(None) if frame.index.tz is not None else frame.index
+
+        if provider_monthly:
+            in_window = (index >= window_start) & (index < window_end)
+            periods, prices = select_per_period(index[in_window], frame[field].to_numpy()[in_window],
+                                                how="first", limit=limit)
+            prepared.append((ticker, None, list(zip(month_keys(periods).tolist(), prices.tolist())),
+                             frame_hash(frame)))
+        else:
+            prepared.append((ticker, daily_bar_rows(ticker, frame, index), None, frame_hash(frame)))
+
+    def write(c):
+        rows = []
+        inserted = {}
+        for ticker, bars, monthly, _ in prepared:
+            series_id, field = ticker_series(ticker, provider_monthly)
+            window_start, window_end, limit = windows[ticker]
+            if bars is not None:
+                upsert_daily_bars(c, bars)
+                monthly = first_bar_per_month(c, ticker, [field.lower()],
+                                              day_key(window_start), day_key(window_end))[:limit]
+
+            rows.extend((series_id, label, price) for label, price in monthly)
+            inserted[ticker] = len(monthly)
+
+            register_series(c, series_id, "yfinance", ticker, field,
+                            f"{ticker} monthly bar {field}" if provider_monthly else None)
+
+        # Upsert every ticker's observations in one statement, then their metadata
+        upsert_observations(c, rows)
+        for ticker, _, _, digest in prepared:
+            update_series_meta(c, ticker_series(ticker, provider_monthly)[0], "yfinance", digest)
+        # Totals come from series_meta: re-fetched months are updated, not added
+        for ticker, count in inserted.items():
+            total = count_observations(c, ticker_series(ticker, provider_monthly)[0])
+            print(f"Inserted {count} {ticker} entries. Total should now be {total}.")
+
+    apply_write(f"tickers {', '.join(group)}", write, writer)
+
+
+# === RUN FUNCTION IF SCRIPT IS CALLED DIRECTLY ===
+if __name__ == '__main__':
+    fetch_and_store_tickers()
@@ -0,0 +1,129 @@
+# === http_cache.py ===
+# On-disk, gzip-compressed cache for JSON API responses (FRED, Alpha Vantage).
+#
+# Entries are keyed by URL + request parameters (API keys excluded), expire
+# after a per-endpoint TTL, and the oldest-used entries are evicted once the
+# cache grows past MAX_CACHE_BYTES.
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from http_client import get_json
+
+CACHE_DIR = ".http_cache"
+MAX_CACHE_BYTES = 200 * 1024 * 1024   # Evict least recently used entries past 200 MB
+DEFAULT_TTL = 6 * 60 * 60             # 6 hours
+
+# TTL in seconds per endpoint. Keys are either a URL or (URL, Alpha Vantage function).
+ENDPOINT_TTLS = {
+    "https://api.stlouisfed.org/fred/series/observations": 12 * 60 * 60,
+    ("https://www.alphavantage.co/query", "TIME_SERIES_DAILY"): 12 * 60 * 60,
+    ("https://www.alphavantage.co/query", "TIME_SERIES_MONTHLY"): 24 * 60 * 60,
+}
+
+# Parameters that must never end up in cache keys or cache files
+SECRET_PARAMS = ("api_key", "apikey")
+
+
+# === Build the cache key for a request ===
+def cache_key(url, params):
+    public = {k: v for k, v in (params or {}).items() if k not in SECRET_PARAMS}
+    raw = url + "?" + json.dumps(public, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# === Look up the TTL for a request ===
+def ttl_for(url, params):
+    function = (params or {}).get("function")
+    if (url, function) in ENDPOINT_TTLS:
+        return ENDPOINT_TTLS[(url, function)]
+    return ENDPOINT_TTLS.get(url, DEFAULT_TTL)
+
+
+# === Decide whether a payload is worth caching ===
+# Alpha Vantage reports throttling and bad requests as HTTP 200 with one of
+# these keys, and FRED uses error_code; neither should be served from disk later.
+def is_cacheable(payload):
+    if not isinstance(payload, dict):
+        return False
+    return not any(k in payload for k in ("Note", "Information", "Error Message", "error_code"))
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, key + ".json.gz")
+
+
+# === Read a cached payload, or None if missing or expired ===
+def read_cache(key, ttl):
+    path = _entry_path(key)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entry = json.load(f)
+        fetched_at, payload = entry["fetched_at"], entry["payload"]
+        expired = time.time() - fetched_at > ttl
+    except (OSError, ValueError, KeyError, TypeError):
+        # Unreadable or malformed entries are a cache miss; the next write replaces them
+        return None
+
+    if expired:
+        return None
+
+    # Touch the file so eviction treats it as recently used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return payload
+
+
+# === Store a payload and evict old entries if needed ===
+def write_cache(key, url, payload):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump({"url": url, "fetched_at": time.time(), "payload": payload}, f)
+    os.replace(tmp_path, path)   # Atomic, so concurrent readers never see half a file
+    evict(MAX_CACHE_BYTES)
+
+
+# === Delete least recently used entries until the cache fits in max_bytes ===
+def evict(max_bytes=MAX_CACHE_BYTES):
+    entries = []
+    total = 0
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(".json.gz"):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+# === GET a JSON endpoint through the cache ===
+# ttl overrides the endpoint TTL; use_cache=False always goes to the network.
+def cached_get_json(url, params=None, ttl=None, use_cache=True):
+    key = cache_key(url, params)
+    if use_cache:
+        payload = read_cache(key, ttl if ttl is not None else ttl_for(url, params))
+        if payload is not None:
+            return payload
+
+    payload = get_json(url, params)
+    if use_cache and is_cacheable(payload):
+        write_cache(key, url, payload)
+    return payload
@@ -0,0 +1,77 @@
+# === http_client.py ===
+# Shared HTTP client for every REST fetcher (FRED, Alpha Vantage).
+#
+# One pooled keep-alive session, gzip, connect/read timeouts, and jittered
+# exponential backoff on connection errors, 5xx and 429 responses.
+# Every attempt is counted against the provider's limits (see rate_limit.py).
+
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limit import acquire, provider_for
+
+CONNECT_TIMEOUT = 5      # Seconds to establish a connection
+READ_TIMEOUT = 30        # Seconds to wait for response data
+MAX_RETRIES = 4          # Retries after the first attempt
+BACKOFF_BASE = 0.5       # First backoff ceiling in seconds, doubled per retry
+BACKOFF_CAP = 30         # Longest single backoff in seconds
+POOL_SIZE = 10           # Keep-alive connections kept per host
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+# === Return the shared session, creating it on first use ===
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Accept-Encoding": "gzip, deflate"})
+            _session = session
+        return _session
+
+
+# === Seconds to wait before retry number `attempt` (0-based) ===
+# "Full jitter": a random delay up to the exponential ceiling, so parallel
+# fetchers that fail together do not retry together. Retry-After wins if given.
+def backoff_delay(attempt, response=None):
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_CAP)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+# === GET a URL with timeouts and retries, returning the response ===
+def get(url, params=None, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), retries=MAX_RETRIES):
+    session = get_session()
+    provider = provider_for(url)
+    for attempt in range(retries + 1):
+        acquire(provider)
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+
+        if response.status_code in RETRY_STATUSES and attempt < retries:
+            time.sleep(backoff_delay(attempt, response))
+            continue
+
+        response.raise_for_status()
+        return response
+
+
+# === GET a JSON endpoint ===
+def get_json(url, params=None, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), retries=MAX_RETRIES):
+    return get(url, params=params, timeout=timeout, retries=retries).json()
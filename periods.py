@@ -0,0 +1,52 @@
+# === periods.py ===
+# Integer period keys used by every table.
+#
+#   month key = months since 1970-01   (observations.period, watermarks)
+#   day key   = days since 1970-01-01  (daily_bars.day, daily_observations.day)
+#
+# These are exactly NumPy's datetime64[M] / datetime64[D] integer
+# representations, so converting a whole column is a single astype in either
+# direction. Text ("YYYY-MM") only appears at the edges: CLI arguments, API
+# parameters and printed output.
+
+import numpy as np
+
+
+# === datetime / "YYYY-MM[-DD]" / datetime64 -> month key ===
+def month_key(value):
+    return int(np.datetime64(value, "M").astype("int64"))
+
+
+# === datetime / "YYYY-MM-DD" / datetime64 -> day key ===
+def day_key(value):
+    return int(np.datetime64(value, "D").astype("int64"))
+
+
+# === Array of dates (datetime64, DatetimeIndex, ISO strings) -> int64 keys ===
+def month_keys(dates):
+    return np.asarray(dates, dtype="datetime64[M]").astype("int64")
+
+
+def day_keys(dates):
+    return np.asarray(dates, dtype="datetime64[D]").astype("int64")
+
+
+# === int keys -> datetime64 (one vectorized cast) ===
+def months_to_datetime64(keys):
+    return np.asarray(keys, dtype="int64").astype("datetime64[M]")
+
+
+def days_to_datetime64(keys):
+    return np.asarray(keys, dtype="int64").astype("datetime64[D]")
+
+
+# === Month key -> first day of the month as a datetime.date ===
+def month_start(key):
+    return np.datetime64(int(key), "M").astype("datetime64[D]").item()
+
+
+# === Month key -> "YYYY-MM" for display ===
+def month_label(key):
+    if key is None:
+        return None
+    return str(np.datetime64(int(key), "M"))
@@ -0,0 +1,181 @@
+# === rate_limit.py ===
+# Per-provider request limits for the REST APIs.
+#
+# - A token bucket per provider spaces out calls (Alpha Vantage free tier: 5/minute)
+# - Daily quotas are counted in QUOTA_FILE so they survive between runs (25/day)
+# - QuotaScheduler orders queued symbol requests so the most valuable ones
+#   are sent first and the rest are deferred instead of being throttled
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+QUOTA_FILE = ".api_quota.json"
+
+# provider: (calls, per_seconds, burst, calls_per_day or None)
+PROVIDER_LIMITS = {
+    "alphavantage": (5, 60, 1, 25),     # burst of 1 keeps calls evenly 12s apart
+    "fred": (120, 60, 10, None),
+}
+
+PROVIDER_HOSTS = {
+    "www.alphavantage.co": "alphavantage",
+    "api.stlouisfed.org": "fred",
+}
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+# === Token bucket: `burst` tokens, refilled at calls/per_seconds ===
+class TokenBucket:
+    def __init__(self, calls, per_seconds, burst):
+        self.rate = calls / per_seconds
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    # Block until a token is available, then take it
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets = {}
+_lock = threading.Lock()
+
+
+# === Map a request URL to its provider name (None if unlimited) ===
+def provider_for(url):
+    return PROVIDER_HOSTS.get(urlparse(url).netloc)
+
+
+def _get_bucket(provider):
+    with _lock:
+        if provider not in _buckets:
+            calls, per_seconds, burst, _ = PROVIDER_LIMITS[provider]
+            _buckets[provider] = TokenBucket(calls, per_seconds, burst)
+        return _buckets[provider]
+
+
+# === Persisted daily counters ===
+# Quotas reset at midnight UTC, so counters are keyed by the UTC date.
+def _today():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _load_usage():
+    try:
+        with open(QUOTA_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_usage(usage):
+    tmp_path = f"{QUOTA_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(usage, f)
+    os.replace(tmp_path, QUOTA_FILE)
+
+
+def _used_today(usage, provider):
+    entry = usage.get(provider, {})
+    return entry.get("used", 0) if entry.get("date") == _today() else 0
+
+
+# === Calls left today for a provider (None if it has no daily quota) ===
+def remaining_today(provider):
+    daily = PROVIDER_LIMITS[provider][3]
+    if daily is None:
+        return None
+    with _lock:
+        return max(0, daily - _used_today(_load_usage(), provider))
+
+
+# === Count one call against today's quota, or raise QuotaExceeded ===
+def reserve_daily(provider):
+    daily = PROVIDER_LIMITS[provider][3]
+    if daily is None:
+        return
+    with _lock:
+        usage = _load_usage()
+        used = _used_today(usage, provider)
+        if used >= daily:
+            raise QuotaExceeded(f"{provider} daily quota of {daily} calls used up for {_today()}")
+        usage[provider] = {"date": _today(), "used": used + 1}
+        _save_usage(usage)
+
+
+# === Record that the provider says today's quota is gone ===
+def mark_exhausted(provider):
+    daily = PROVIDER_LIMITS[provider][3]
+    if daily is None:
+        return
+    with _lock:
+        usage = _load_usage()
+        usage[provider] = {"date": _today(), "used": daily}
+        _save_usage(usage)
+
+
+# === Wait for permission to send one request to `provider` ===
+def acquire(provider):
+    if provider is None or provider not in PROVIDER_LIMITS:
+        return
+    reserve_daily(provider)
+    _get_bucket(provider).acquire()
+
+
+# === Detect an Alpha Vantage throttle reply (HTTP 200 with a "Note"/"Information") ===
+# Returns the provider's message, or None if the payload is real data.
+def throttle_message(provider, payload):
+    if not isinstance(payload, dict):
+        return None
+    message = payload.get("Note") or payload.get("Information")
+    if message and "per day" in message.lower():
+        mark_exhausted(provider)
+    return message
+
+
+# === QuotaScheduler: order and space queued symbol requests ===
+# submit() requests with an estimate of how many rows each would add, then
+# run() sends them highest value first, within today's remaining quota.
+# Spacing between calls comes from the provider's token bucket.
+class QuotaScheduler:
+    def __init__(self, provider):
+        self.provider = provider
+        self.queue = {}
+
+    # Queue a request; resubmitting the same symbol keeps the more valuable request
+    def submit(self, symbol, params, value=1):
+        current = self.queue.get(symbol)
+        if current is None or value > current[1]:
+            self.queue[symbol] = (params, value)
+
+    # Call handler(params) for each planned request, yielding (symbol, result).
+    # Requests that do not fit in today's quota are reported and skipped.
+    def run(self, handler):
+        ordered = sorted(self.queue.items(), key=lambda item: item[1][1], reverse=True)
+        self.queue = {}
+
+        budget = remaining_today(self.provider)
+        if budget is not None and budget < len(ordered):
+            for symbol, _ in ordered[budget:]:
+                print(f"Deferred {symbol}: {self.provider} daily quota reached.")
+            ordered = ordered[:budget]
+
+        for symbol, (params, _) in ordered:
+            yield symbol, handler(params)
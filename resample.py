@@ -0,0 +1,64 @@
+# === resample.py ===
+# Vectorized "one value per month" selection shared by every fetcher.
+#
+# Replaces the per-row loops (DataFrame.iterrows / dict-of-months) with NumPy
+# grouping: observations are sorted once, month boundaries are found with one
+# comparison, and first/last/mean/OHLC are taken with fancy indexing and
+# ufunc.reduceat. periods.month_keys turns the output periods into DB keys.
+
+import numpy as np
+
+HOW = ("first", "last", "mean", "ohlc")
+
+
+# === Pick one value per month ===
+# dates:  anything np.asarray can turn into datetime64 (DatetimeIndex, ISO strings, ...)
+# values: 1-D array, or 2-D (one row per date) to select several fields together
+# how:    "first", "last", "mean", or "ohlc" (1-D input only -> columns open, high, low, close)
+# limit:  keep only the first `limit` months
+# Rows with NaN in any field are ignored. Returns (periods as datetime64[M], values).
+def select_per_period(dates, values, how="first", limit=None):
+    if how not in HOW:
+        raise ValueError(f"Unknown aggregation {how!r}, expected one of {HOW}")
+
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    values = np.asarray(values, dtype="float64")
+    if how == "ohlc" and values.ndim != 1:
+        raise ValueError("ohlc aggregation needs a 1-D value series")
+
+    # Drop missing observations, then sort by date (stable keeps same-day order)
+    nan_rows = np.isnan(values) if values.ndim == 1 else np.isnan(values).any(axis=1)
+    keep = ~nan_rows & ~np.isnat(dates)
+    dates, values = dates[keep], values[keep]
+    order = np.argsort(dates, kind="stable")
+    dates, values = dates[order], values[order]
+
+    if len(dates) == 0:
+        return np.array([], dtype="datetime64[M]"), values
+
+    # Index range [start, end) of every month
+    months = dates.astype("datetime64[M]")
+    starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+    ends = np.r_[starts[1:], len(dates)]
+    if limit:
+        starts, ends = starts[:limit], ends[:limit]
+
+    if how == "first":
+        out = values[starts]
+    elif how == "last":
+        out = values[ends - 1]
+    elif how == "mean":
+        # reduceat runs each group to the next start; slicing ends the last group
+        out = np.add.reduceat(values[:ends[-1]], starts, axis=0)
+        counts = ends - starts
+        out = out / (counts if values.ndim == 1 else counts[:, None])
+    else:
+        window = values[:ends[-1]]
+        out = np.column_stack([
+            values[starts],
+            np.maximum.reduceat(window, starts),
+            np.minimum.reduceat(window, starts),
+            values[ends - 1],
+        ])
+
+    return months[starts], out
@@ -0,0 +1,153 @@
+# === rolling.py ===
+# Rolling-window mean, volatility, covariance and correlation for the
+# analytics library.
+#
+# Every statistic is built from window sums of a few moments (count, x, x^2,
+# x*y). Each moment's prefix sum is computed once, and a window sum is the
+# difference of two prefix rows, so one window costs O(n) no matter its
+# length, and extra windows reuse the same prefix sums. Missing values (NaN)
+# are masked out: every pair of columns uses the months where both are
+# present, as in analytics.correlation_matrix.
+#
+# Mean and volatility only need per-column sums, (rows + 1, columns) each.
+# Covariance and correlation need one (rows + 1, columns, columns) tensor per
+# moment, so those are only built when cov or corr is asked for.
+#
+# Outputs have the same number of rows as the input; row t describes the
+# window ending at row t, and rows without min_periods values are NaN.
+
+import numpy as np
+from analytics import nan_mean
+
+STATS = ("mean", "vol", "cov", "corr")
+PAIRWISE = ("cov", "corr")
+COLUMN_MOMENTS = ("count", "sum", "squares")
+PAIR_MOMENTS = ("pair_count", "pair_sum", "pair_squares", "products")
+
+
+# Prefix sums along the rows with a leading zero row: out[t] = sum of rows < t
+def _prefix_sum(values):
+    out = np.zeros((len(values) + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+
+# Same for the outer products left_i * right_j, built in place so only the
+# (rows + 1, columns, columns) result is allocated
+def _pair_prefix_sum(left, right):
+    rows, columns = left.shape
+    out = np.zeros((rows + 1, columns, columns))
+    np.multiply(left[:, :, None], right[:, None, :], out=out[1:])
+    np.add.accumulate(out[1:], axis=0, out=out[1:])
+    return out
+
+
+# === Prefix sums of the moments the rolling statistics need ===
+# matrix: (rows, columns). Per column, (rows + 1, columns):
+#   count     present
+#   sum       x
+#   squares   x^2
+# With pairwise=True also, (rows + 1, columns, columns), indexed [t, i, j]:
+#   pair_count     both i and j present
+#   pair_sum       x_i where both present
+#   pair_squares   x_i^2 where both present
+#   products       x_i * x_j
+# Columns are centered on their mean first, which keeps the sums small and the
+# differences accurate over long histories.
+def cumulative_moments(matrix, pairwise=False):
+    matrix = np.asarray(matrix, dtype="float64")
+    mask = (~np.isnan(matrix)).astype("float64")
+    offset = nan_mean(matrix)
+    centered = np.where(mask > 0, matrix - offset, 0.0)
+    squared = centered ** 2
+
+    prefix = {
+        "offset": offset,
+        "count": _prefix_sum(mask),
+        "sum": _prefix_sum(centered),
+        "squares": _prefix_sum(squared),
+    }
+    if pairwise:
+        prefix["pair_count"] = _pair_prefix_sum(mask, mask)
+        prefix["pair_sum"] = _pair_prefix_sum(centered, mask)
+        prefix["pair_squares"] = _pair_prefix_sum(squared, mask)
+        prefix["products"] = _pair_prefix_sum(centered, centered)
+    return prefix
+
+
+# === Sum of each moment over the window ending at every row ===
+# Two prefix rows per window. The first window - 1 rows cover only the rows
+# available so far (min_periods decides whether they count).
+def _window_sums(prefix, window, names):
+    ends = np.arange(1, len(prefix["count"]))
+    starts = np.maximum(ends - window, 0)
+    return {name: prefix[name][ends] - prefix[name][starts] for name in names}
+
+
+# === Rolling statistics for one window length ===
+# stats: any of STATS. Returns a dict with the requested arrays:
+#   mean  (rows, columns)            vol   (rows, columns)
+#   cov   (rows, columns, columns)   corr  (rows, columns, columns)
+# vol is the standard deviation with the given ddof (0 matches analytics.volatility).
+# cov and corr need a prefix built with cumulative_moments(..., pairwise=True).
+def window_stats(prefix, window, min_periods=None, ddof=0, stats=STATS):
+    if window < 1:
+        raise ValueError(f"Window must be at least 1 row, got {window}")
+    unknown = set(stats) - set(STATS)
+    if unknown:
+        raise ValueError(f"Unknown rolling statistics: {sorted(unknown)}")
+    if any(stat in PAIRWISE for stat in stats) and "products" not in prefix:
+        raise ValueError("cov and corr need cumulative_moments(matrix, pairwise=True)")
+    min_periods = max(window if min_periods is None else min_periods, 1)
+    result = {}
+
+    if "mean" in stats or "vol" in stats:
+        sums = _window_sums(prefix, window, COLUMN_MOMENTS)
+        count, total = sums["count"], sums["sum"]
+        short = count < min_periods
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if "mean" in stats:
+                result["mean"] = np.where(short, np.nan, total / count + prefix["offset"])
+            if "vol" in stats:
+                spread = np.maximum(sums["squares"] - total ** 2 / count, 0)
+                result["vol"] = np.where(short | (count <= ddof), np.nan, np.sqrt(spread / (count - ddof)))
+
+    if any(stat in PAIRWISE for stat in stats):
+        sums = _window_sums(prefix, window, PAIR_MOMENTS)
+        count, total = sums["pair_count"], sums["pair_sum"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Cross terms about each pair's own window mean
+            co_moment = sums["products"] - total * np.swapaxes(total, 1, 2) / count
+            if "cov" in stats:
+                short = (count < min_periods) | (count <= ddof)
+                result["cov"] = np.where(short, np.nan, co_moment / (count - ddof))
+            if "corr" in stats:
+                spread = sums["pair_squares"] - total ** 2 / count
+                corr = co_moment / np.sqrt(spread * np.swapaxes(spread, 1, 2))
+                result["corr"] = np.clip(np.where((count < min_periods) | (count < 2), np.nan, corr), -1, 1)
+    return result
+
+
+# === Rolling statistics for several window lengths, sharing one set of prefix sums ===
+# Returns {window: window_stats(...)}. Pairwise sums are only built when
+# stats includes cov or corr.
+def rolling_stats(matrix, windows, min_periods=None, ddof=0, stats=STATS):
+    prefix = cumulative_moments(matrix, pairwise=any(stat in PAIRWISE for stat in stats))
+    return {window: window_stats(prefix, window, min_periods, ddof, stats) for window in windows}
+
+
+# === Single-statistic shortcuts ===
+def rolling_mean(matrix, window, min_periods=None):
+    return rolling_stats(matrix, [window], min_periods, stats=("mean",))[window]["mean"]
+
+
+def rolling_vol(matrix, window, min_periods=None, ddof=0):
+    return rolling_stats(matrix, [window], min_periods, ddof, stats=("vol",))[window]["vol"]
+
+
+def rolling_cov(matrix, window, min_periods=None, ddof=0):
+    return rolling_stats(matrix, [window], min_periods, ddof, stats=("cov",))[window]["cov"]
+
+
+def rolling_corr(matrix, window, min_periods=None):
+    return rolling_stats(matrix, [window], min_periods, stats=("corr",))[window]["corr"]
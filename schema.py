@@ -0,0 +1,350 @@
+# === schema.py ===
+# Single, versioned definition of the database schema.
+#
+# MIGRATIONS is an ordered list; each entry moves the schema up one version.
+# migrate() applies whatever a database is missing and records it in
+# schema_version. db.connect() runs it once per process, so fetchers never
+# issue CREATE TABLE on their hot path. To change storage, append a new
+# migration - never edit one that has already shipped.
+
+from datetime import datetime
+
+# Price columns of Combined_Prices that each get a partial index
+PRICE_COLUMNS = ["btc_price", "sp500_price", "gold_open", "gold_close", "oil_price", "cpi_value"]
+
+# Series behind the legacy Combined_Prices columns:
+# (series_id, source, symbol, field, column_name, description)
+LEGACY_SERIES = [
+    ("BTC-USD.open", "yfinance", "BTC-USD", "Open", "btc_price", "Bitcoin, first trading day open"),
+    ("SPY.close", "yfinance", "SPY", "Close", "sp500_price", "S&P 500 ETF, first trading day close"),
+    ("GLD.open", "alphavantage", "GLD", "open", "gold_open", "Gold ETF, first trading day open"),
+    ("GLD.close", "alphavantage", "GLD", "close", "gold_close", "Gold ETF, first trading day close"),
+    ("GLD.change", "alphavantage", "GLD", "change", "gold_change", "Gold direction, 1 = up, 0 = down"),
+    ("DCOILWTICO", "fred", "DCOILWTICO", "value", "oil_price", "WTI crude oil price"),
+    ("CPIAUCSL", "fred", "CPIAUCSL", "value", "cpi_value", "Consumer Price Index, all urban"),
+]
+
+
+# === Version 1: the original tables ===
+# IF NOT EXISTS so databases created before versioning are adopted as-is.
+def _v1_base_tables(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Combined_Prices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT UNIQUE,
+            btc_price REAL,
+            sp500_price REAL,
+            gold_open REAL,
+            gold_close REAL,
+            gold_change INTEGER,  -- FK to Gold_Change.id
+            oil_price REAL,
+            cpi_value REAL
+        )
+    """)
+
+    # Gold_Change lookup (0 = down, 1 = up)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Gold_Change (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            label string
+        )
+    """)
+    c.execute("INSERT OR IGNORE INTO Gold_Change (id, label) VALUES (0, 'down')")
+    c.execute("INSERT OR IGNORE INTO Gold_Change (id, label) VALUES (1, 'up')")
+
+    # Last stored month of every series (see fetch_modes.py)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Series_Watermarks (
+            series TEXT PRIMARY KEY,
+            last_period TEXT,
+            updated_at TEXT
+        )
+    """)
+
+
+# === Version 2: partial indexes for the per-series query paths ===
+# Fetchers run COUNT(col) / MAX(date) WHERE col IS NOT NULL; a partial index
+# per column answers those from an index holding only that series' rows.
+def _v2_partial_indexes(c):
+    for column in PRICE_COLUMNS:
+        c.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_combined_{column}
+            ON Combined_Prices (date) WHERE {column} IS NOT NULL
+        """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_combined_gold_change ON Combined_Prices (gold_change)")
+
+
+# === Version 3: long-format observation store ===
+# One narrow row per (series_id, period) in a WITHOUT ROWID table clustered on
+# its primary key, so one series' range scan is a contiguous B-tree read and
+# adding a series is an INSERT into the `series` catalog, not an ALTER TABLE.
+# The wide table is replaced by a view with the same name and columns.
+def _v3_observation_store(c):
+    c.execute("""
+        CREATE TABLE series (
+            series_id TEXT PRIMARY KEY,
+            source TEXT,
+            symbol TEXT,
+            field TEXT,
+            column_name TEXT UNIQUE,   -- legacy Combined_Prices column, if any
+            description TEXT
+        )
+    """)
+    c.execute("""
+        CREATE TABLE observations (
+            series_id TEXT NOT NULL,
+            period TEXT NOT NULL,      -- "YYYY-MM"
+            value REAL,
+            PRIMARY KEY (series_id, period)
+        ) WITHOUT ROWID
+    """)
+    c.executemany("""
+        INSERT INTO series (series_id, source, symbol, field, column_name, description)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, LEGACY_SERIES)
+
+    # Extra FRED columns that earlier versions added on demand become series
+    # named after the upper-cased column, matching the FRED ID they came from
+    c.execute("PRAGMA table_info(Combined_Prices)")
+    known = {row[4] for row in LEGACY_SERIES} | {"id", "date"}
+    for column in [row[1] for row in c.fetchall() if row[1] not in known]:
+        c.execute("""
+            INSERT INTO series (series_id, source, symbol, field, column_name, description)
+            VALUES (?, 'fred', ?, 'value', ?, NULL)
+        """, (column.upper(), column.upper(), column))
+
+    # Copy every non-NULL cell into observations
+    c.execute("SELECT series_id, column_name FROM series")
+    for series_id, column in c.fetchall():
+        c.execute(f"""
+            INSERT INTO observations (series_id, period, value)
+            SELECT ?, date, {column} FROM Combined_Prices WHERE {column} IS NOT NULL
+        """, (series_id,))
+
+    # Watermarks were keyed by column name; key them by series_id instead
+    c.execute("""
+        UPDATE Series_Watermarks
+        SET series = (SELECT series_id FROM series WHERE column_name = Series_Watermarks.series)
+        WHERE series IN (SELECT column_name FROM series)
+    """)
+
+    # Swap the wide table for a compatibility view of the same shape
+    c.execute("DROP TABLE Combined_Prices")
+    c.execute("""
+        CREATE VIEW Combined_Prices AS
+        SELECT
+            ROW_NUMBER() OVER (ORDER BY period) AS id,
+            period AS date,
+            MAX(CASE WHEN series_id = 'BTC-USD.open' THEN value END) AS btc_price,
+            MAX(CASE WHEN series_id = 'SPY.close' THEN value END) AS sp500_price,
+            MAX(CASE WHEN series_id = 'GLD.open' THEN value END) AS gold_open,
+            MAX(CASE WHEN series_id = 'GLD.close' THEN value END) AS gold_close,
+            CAST(MAX(CASE WHEN series_id = 'GLD.change' THEN value END) AS INTEGER) AS gold_change,
+            MAX(CASE WHEN series_id = 'DCOILWTICO' THEN value END) AS oil_price,
+            MAX(CASE WHEN series_id = 'CPIAUCSL' THEN value END) AS cpi_value
+        FROM observations
+        WHERE series_id IN ('BTC-USD.open', 'SPY.close', 'GLD.open', 'GLD.close',
+                            'GLD.change', 'DCOILWTICO', 'CPIAUCSL')
+        GROUP BY period
+    """)
+
+
+# === Version 4: daily tier ===
+# Everything the providers return per trading day, so monthly values can be
+# derived from it (store.first_bar_per_month) instead of being all we keep.
+# Both tables are WITHOUT ROWID with the primary key as the clustered index:
+# the (series, day) key covers every column, so a range read of one series
+# never leaves the B-tree.
+def _v4_daily_tier(c):
+    c.execute("""
+        CREATE TABLE daily_bars (
+            symbol TEXT NOT NULL,
+            day TEXT NOT NULL,         -- "YYYY-MM-DD"
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume INTEGER,
+            PRIMARY KEY (symbol, day)
+        ) WITHOUT ROWID
+    """)
+    c.execute("""
+        CREATE TABLE daily_observations (
+            series_id TEXT NOT NULL,
+            day TEXT NOT NULL,         -- "YYYY-MM-DD"
+            value REAL,
+            PRIMARY KEY (series_id, day)
+        ) WITHOUT ROWID
+    """)
+
+
+# === Version 5: integer period keys ===
+# "YYYY-MM" periods become months since 1970-01 and "YYYY-MM-DD" days become
+# days since 1970-01-01 (see periods.py). SQLite cannot change a column's type
+# in place, so each table is rebuilt and swapped in.
+MONTH_FROM_TEXT = "((CAST(substr({col}, 1, 4) AS INTEGER) - 1970) * 12 + CAST(substr({col}, 6, 2) AS INTEGER) - 1)"
+DAY_FROM_TEXT = "CAST(julianday({col}) - 2440587.5 AS INTEGER)"
+
+
+def _v5_integer_periods(c):
+    # The view depends on observations; it is recreated below
+    c.execute("DROP VIEW Combined_Prices")
+
+    c.execute("""
+        CREATE TABLE observations_new (
+            series_id TEXT NOT NULL,
+            period INTEGER NOT NULL,   -- months since 1970-01
+            value REAL,
+            PRIMARY KEY (series_id, period)
+        ) WITHOUT ROWID
+    """)
+    c.execute(f"""
+        INSERT INTO observations_new (series_id, period, value)
+        SELECT series_id, {MONTH_FROM_TEXT.format(col="period")}, value FROM observations
+    """)
+
+    c.execute("""
+        CREATE TABLE daily_bars_new (
+            symbol TEXT NOT NULL,
+            day INTEGER NOT NULL,      -- days since 1970-01-01
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume INTEGER,
+            PRIMARY KEY (symbol, day)
+        ) WITHOUT ROWID
+    """)
+    c.execute(f"""
+        INSERT INTO daily_bars_new (symbol, day, open, high, low, close, volume)
+        SELECT symbol, {DAY_FROM_TEXT.format(col="day")}, open, high, low, close, volume FROM daily_bars
+    """)
+
+    c.execute("""
+        CREATE TABLE daily_observations_new (
+            series_id TEXT NOT NULL,
+            day INTEGER NOT NULL,      -- days since 1970-01-01
+            value REAL,
+            PRIMARY KEY (series_id, day)
+        ) WITHOUT ROWID
+    """)
+    c.execute(f"""
+        INSERT INTO daily_observations_new (series_id, day, value)
+        SELECT series_id, {DAY_FROM_TEXT.format(col="day")}, value FROM daily_observations
+    """)
+
+    c.execute("""
+        CREATE TABLE Series_Watermarks_new (
+            series TEXT PRIMARY KEY,
+            last_period INTEGER,       -- months since 1970-01
+            updated_at TEXT
+        )
+    """)
+    c.execute(f"""
+        INSERT INTO Series_Watermarks_new (series, last_period, updated_at)
+        SELECT series, {MONTH_FROM_TEXT.format(col="last_period")}, updated_at
+        FROM Series_Watermarks WHERE last_period IS NOT NULL
+    """)
+
+    for table in ("observations", "daily_bars", "daily_observations", "Series_Watermarks"):
+        c.execute(f"DROP TABLE {table}")
+        c.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+    # Same columns as before plus the integer period; date is rendered from it
+    c.execute("""
+        CREATE VIEW Combined_Prices AS
+        SELECT
+            ROW_NUMBER() OVER (ORDER BY period) AS id,
+            printf('%04d-%02d', 1970 + period / 12, period % 12 + 1) AS date,
+            period,
+            MAX(CASE WHEN series_id = 'BTC-USD.open' THEN value END) AS btc_price,
+            MAX(CASE WHEN series_id = 'SPY.close' THEN value END) AS sp500_price,
+            MAX(CASE WHEN series_id = 'GLD.open' THEN value END) AS gold_open,
+            MAX(CASE WHEN series_id = 'GLD.close' THEN value END) AS gold_close,
+            CAST(MAX(CASE WHEN series_id = 'GLD.change' THEN value END) AS INTEGER) AS gold_change,
+            MAX(CASE WHEN series_id = 'DCOILWTICO' THEN value END) AS oil_price,
+            MAX(CASE WHEN series_id = 'CPIAUCSL' THEN value END) AS cpi_value
+        FROM observations
+        WHERE series_id IN ('BTC-USD.open', 'SPY.close', 'GLD.open', 'GLD.close',
+                            'GLD.change', 'DCOILWTICO', 'CPIAUCSL')
+        GROUP BY period
+    """)
+
+
+# === Version 6: per-series metadata ===
+# series_meta keeps each series' row count, period range, last fetch time and
+# the hash of the last payload, updated in the same transaction as the data
+# (store.update_series_meta). Fetchers plan their windows and freshness skips
+# from this one row instead of scanning observations. Its last_period replaces
+# Series_Watermarks.
+def _v6_series_meta(c):
+    c.execute("""
+        CREATE TABLE series_meta (
+            series_id TEXT PRIMARY KEY,
+            source TEXT,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            first_period INTEGER,      -- months since 1970-01
+            last_period INTEGER,       -- months since 1970-01
+            last_fetch_at TEXT,
+            payload_hash TEXT
+        )
+    """)
+    c.execute("""
+        INSERT INTO series_meta (series_id, source, row_count, first_period, last_period, last_fetch_at)
+        SELECT o.series_id, s.source, COUNT(*), MIN(o.period), MAX(o.period), w.updated_at
+        FROM observations o
+        LEFT JOIN series s ON s.series_id = o.series_id
+        LEFT JOIN Series_Watermarks w ON w.series = o.series_id
+        GROUP BY o.series_id
+    """)
+    c.execute("DROP TABLE Series_Watermarks")
+
+
+# (version, description, function) in the order they must run
+MIGRATIONS = [
+    (1, "base tables", _v1_base_tables),
+    (2, "partial indexes on price columns", _v2_partial_indexes),
+    (3, "long-format observations, series catalog, Combined_Prices view", _v3_observation_store),
+    (4, "daily_bars and daily_observations", _v4_daily_tier),
+    (5, "integer month and day keys", _v5_integer_periods),
+    (6, "series_meta replaces Series_Watermarks", _v6_series_meta),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# === Current schema version of a database (0 if never migrated) ===
+def current_version(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT
+        )
+    """)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+# === Bring a database up to LATEST_VERSION ===
+# Each migration runs in its own transaction together with its schema_version
+# row, so a failed migration leaves the database at the previous version.
+def migrate(conn):
+    if current_version(conn) >= LATEST_VERSION:
+        return
+
+    for version, description, func in MIGRATIONS:
+        # IMMEDIATE takes the write lock first, so two processes starting at
+        # once cannot both apply the same migration
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+            c = conn.cursor()
+            func(c)
+            c.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                      (version, description, datetime.now().isoformat(timespec="seconds")))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
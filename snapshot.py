@@ -0,0 +1,201 @@
+# === snapshot.py ===
+# Memory-mappable columnar snapshot of every monthly series, for analytics.
+#
+# Each database file gets its own snapshot directory under SNAPSHOT_DIR (see
+# snapshot_dir), so a run against a scratch --db never replaces the
+# production snapshot. An in-memory database gets a temporary directory that
+# is removed when the process exits.
+#
+# export_snapshot() writes one generation directory inside it with
+# two .npy files per series:
+#   <generation>/<series_id>.period.npy   int64 month keys (see periods.py), ascending
+#   <generation>/<series_id>.value.npy    float64 values
+# plus index.json, a small header naming the current generation, with the row
+# count and period range of each series and the database fingerprint the
+# snapshot was built from.
+#
+# A generation is never modified once it is in place: a new export builds a
+# new directory and then swaps index.json, so a reader always pairs an index
+# with the files it describes. The generation before the current one is kept
+# for readers that are still opening it; older ones are removed once they are
+# PRUNE_AFTER seconds old.
+#
+# The fingerprint is a hash of series_meta (row counts, period ranges, payload
+# hashes) and the schema version. Every write updates series_meta, so any
+# change to the data changes the fingerprint and load_snapshot() rebuilds the
+# files. Fetch times are left out: a re-fetch that returns the same payload
+# leaves the snapshot valid. A fresh snapshot is opened with
+# np.load(mmap_mode="r"): nothing is parsed or copied up front, and concurrent
+# analysis processes share the same OS pages.
+
+import atexit
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import numpy as np
+from db import connect, database_setting
+
+SNAPSHOT_DIR = ".snapshot"
+INDEX_FILE = "index.json"
+LOAD_ATTEMPTS = 3     # Re-read the index this many times if an export swaps it mid-load
+PRUNE_AFTER = 300     # Seconds before an unused generation may be removed
+
+_memory_dir = None    # Temporary snapshot directory of this process's in-memory database
+
+
+# === Snapshot directory of a database ===
+# path=None follows the data-store setting (db.database_setting); an explicit
+# path is always the file at that path. Files map to
+# SNAPSHOT_DIR/<file name>-<hash of its absolute path>.
+def snapshot_dir(path=None):
+    global _memory_dir
+    if path is None:
+        path, memory = database_setting()
+        if memory:
+            if _memory_dir is None:
+                _memory_dir = tempfile.mkdtemp(prefix="snapshot-")
+                atexit.register(shutil.rmtree, _memory_dir, ignore_errors=True)
+            return _memory_dir
+    name = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:8]
+    return os.path.join(SNAPSHOT_DIR, f"{name}-{digest}")
+
+
+# === Fingerprint of the database contents the snapshot depends on ===
+def db_fingerprint(c):
+    c.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    digest = hashlib.sha256(str(c.fetchone()[0]).encode())
+    c.execute("""
+        SELECT series_id, row_count, first_period, last_period, payload_hash
+        FROM series_meta ORDER BY series_id
+    """)
+    for row in c.fetchall():
+        digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+def _paths(directory, generation, series_id):
+    return (os.path.join(directory, generation, f"{series_id}.period.npy"),
+            os.path.join(directory, generation, f"{series_id}.value.npy"))
+
+
+def _read_index(directory):
+    try:
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# === Write every series in observations to a new generation and switch to it ===
+# directory=None uses snapshot_dir(path). Returns the index that was written.
+def export_snapshot(directory=None, path=None):
+    directory = directory or snapshot_dir(path)
+    os.makedirs(directory, exist_ok=True)
+    previous = _read_index(directory)
+    with connect(path) as conn:
+        c = conn.cursor()
+        # One read transaction, so the fingerprint matches the data exported
+        c.execute("BEGIN")
+        fingerprint = db_fingerprint(c)
+        c.execute("SELECT series_id FROM series_meta WHERE row_count > 0 ORDER BY series_id")
+        series_ids = [row[0] for row in c.fetchall()]
+
+        # Unique per export, so concurrent exports never write the same files
+        generation = f"{fingerprint[:16]}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(os.path.join(directory, generation))
+        index = {"fingerprint": fingerprint, "generation": generation, "series": {}}
+        for series_id in series_ids:
+            # One primary-key range scan per series, already in period order.
+            # The cursor is streamed straight into one float64 buffer (NULL ->
+            # NaN), so no list of row tuples is ever held in memory.
+            c.execute("""
+                SELECT period, COALESCE(value, 'NaN') FROM observations
+                WHERE series_id = ? ORDER BY period
+            """, (series_id,))
+            data = np.fromiter(itertools.chain.from_iterable(c), dtype="float64").reshape(-1, 2)
+            periods, values = data[:, 0].astype("int64"), np.ascontiguousarray(data[:, 1])
+
+            period_path, value_path = _paths(directory, generation, series_id)
+            np.save(period_path, periods)
+            np.save(value_path, values)
+            index["series"][series_id] = {
+                "rows": len(periods),
+                "first_period": int(periods[0]) if len(periods) else None,
+                "last_period": int(periods[-1]) if len(periods) else None,
+            }
+
+    # The index goes last: it only points at files that are complete
+    tmp = os.path.join(directory, f"{INDEX_FILE}.{uuid.uuid4().hex}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp, os.path.join(directory, INDEX_FILE))
+
+    # Drop generations that are neither current nor previous. Young ones may be
+    # another process's export still in progress, so they are left for later.
+    keep = {generation, previous.get("generation") if previous else None}
+    for name in os.listdir(directory):
+        full = os.path.join(directory, name)
+        try:
+            if os.path.isdir(full) and name not in keep and time.time() - os.path.getmtime(full) > PRUNE_AFTER:
+                shutil.rmtree(full, ignore_errors=True)
+            elif name.endswith(".npy"):
+                os.remove(full)   # Left over from the old flat layout
+        except OSError:
+            pass
+    return index
+
+
+# === Map every requested series of one generation ===
+# Raises ValueError if the files do not match the row counts in the index.
+def _open_series(index, series_ids, directory):
+    series = {}
+    for series_id in (series_ids if series_ids is not None else index["series"]):
+        if series_id not in index["series"]:
+            series[series_id] = (np.array([], dtype="int64"), np.array([], dtype="float64"))
+            continue
+        period_path, value_path = _paths(directory, index["generation"], series_id)
+        periods, values = np.load(period_path, mmap_mode="r"), np.load(value_path, mmap_mode="r")
+        rows = index["series"][series_id]["rows"]
+        if len(periods) != rows or len(values) != rows:
+            raise ValueError(f"Snapshot of {series_id} has {len(periods)}/{len(values)} rows, "
+                             f"index says {rows}")
+        series[series_id] = (periods, values)
+    return series
+
+
+# === Open series from the snapshot, rebuilding it if the database changed ===
+# Returns {series_id: (periods, values)} as read-only memory-mapped arrays.
+# series_ids=None loads every series in the snapshot; directory=None uses
+# snapshot_dir(path). If a concurrent export swaps or removes the generation
+# being opened, the index is read again.
+def load_snapshot(series_ids=None, directory=None, path=None):
+    directory = directory or snapshot_dir(path)
+    with connect(path) as conn:
+        fingerprint = db_fingerprint(conn.cursor())
+
+    failed = None
+    for attempt in range(LOAD_ATTEMPTS):
+        index = _read_index(directory)
+        # Rebuild if stale, or if the generation that just failed is still current (damaged files)
+        if (index is None or index.get("fingerprint") != fingerprint
+                or index.get("generation") in (None, failed)):
+            index = export_snapshot(directory, path)
+        try:
+            return _open_series(index, series_ids, directory)
+        except (OSError, ValueError) as e:
+            if attempt == LOAD_ATTEMPTS - 1:
+                raise
+            failed = index["generation"]
+            print(f"Snapshot changed while loading ({type(e).__name__}: {e}), retrying")
+
+
+# === MAIN EXECUTION ===
+if __name__ == '__main__':
+    index = export_snapshot()
+    print(f"Wrote {len(index['series'])} series to {snapshot_dir()}/")
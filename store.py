@@ -0,0 +1,179 @@
+# === store.py ===
+# Shared read/write helpers for the long-format observation store.
+#
+# Every value lives in observations(series_id, period, value), keyed by an
+# integer month (see periods.py); the series table is the catalog of what is
+# tracked. Combined_Prices is a read-only view over these tables (see schema.py).
+#
+# The daily tier (daily_bars for OHLCV, daily_observations for single-value
+# series) keeps every trading day; monthly observations are derived from it.
+
+import hashlib
+import json
+import numpy as np
+from datetime import datetime
+from periods import days_to_datetime64, month_keys
+from resample import select_per_period
+
+BAR_FIELDS = ("open", "high", "low", "close", "volume")
+MAX_DAY = 2 ** 31 - 1   # Open-ended upper bound for day-key ranges
+
+
+# === Add a series to the catalog (no-op if it is already there) ===
+def register_series(c, series_id, source, symbol=None, field=None, description=None):
+    c.execute("""
+        INSERT OR IGNORE INTO series (series_id, source, symbol, field, description)
+        VALUES (?, ?, ?, ?, ?)
+    """, (series_id, source, symbol, field, description))
+
+
+# === Series ID for provider-aggregated monthly values ===
+# Monthly values a provider aggregates itself (yfinance/Alpha Vantage monthly
+# bars, FRED monthly averages) mean something different from the first
+# trading day values derived from the daily tier, so they are stored as their
+# own series, e.g. SPY.close.1mo or DCOILWTICO.avg, and never mixed in.
+def aggregate_series_id(series_id, aggregation):
+    return f"{series_id}.{aggregation}"
+
+
+# === Series metadata ===
+# series_meta holds one row per series (see schema.py), so planning a fetch is
+# a primary-key lookup instead of a scan of observations.
+
+# Number of stored observations for a series
+def count_observations(c, series_id):
+    c.execute("SELECT row_count FROM series_meta WHERE series_id = ?", (series_id,))
+    row = c.fetchone()
+    return row[0] if row else 0
+
+
+# Latest stored month key of a series, or None
+def last_period(c, series_id):
+    c.execute("SELECT last_period FROM series_meta WHERE series_id = ?", (series_id,))
+    row = c.fetchone()
+    return row[0] if row else None
+
+
+# True if the series was fetched less than max_age seconds ago (None = never fresh)
+def is_fresh(c, series_id, max_age):
+    if not max_age:
+        return False
+    c.execute("SELECT last_fetch_at FROM series_meta WHERE series_id = ?", (series_id,))
+    row = c.fetchone()
+    if not row or not row[0]:
+        return False
+    return (datetime.now() - datetime.fromisoformat(row[0])).total_seconds() < max_age
+
+
+# SHA-256 of a provider payload: bytes as-is, anything else as canonical JSON
+def payload_hash(payload):
+    if not isinstance(payload, bytes):
+        payload = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+# Recompute a series' metadata from its observations and stamp the fetch time.
+# Call in the same transaction as the data write.
+def update_series_meta(c, series_id, source, payload_hash=None):
+    c.execute("""
+        INSERT INTO series_meta (series_id, source, row_count, first_period, last_period,
+                                 last_fetch_at, payload_hash)
+        SELECT ?, ?, COUNT(*), MIN(period), MAX(period), ?, ?
+        FROM observations WHERE series_id = ?
+        ON CONFLICT(series_id) DO UPDATE SET
+            source = excluded.source,
+            row_count = excluded.row_count,
+            first_period = excluded.first_period,
+            last_period = excluded.last_period,
+            last_fetch_at = excluded.last_fetch_at,
+            payload_hash = COALESCE(excluded.payload_hash, payload_hash)
+    """, (series_id, source, datetime.now().isoformat(timespec="seconds"), payload_hash, series_id))
+
+
+# === Bulk upserts ===
+# A batch is staged into a TEMP table with one executemany, then merged with a
+# single INSERT ... SELECT ... ON CONFLICT. The DO UPDATE only fires when a
+# value actually differs, so re-fetching unchanged history writes no pages.
+# Everything runs in the caller's transaction; the caller commits once.
+# Returns the number of rows inserted or changed.
+
+# table: (key columns, value columns)
+UPSERT_TABLES = {
+    "observations": (("series_id", "period"), ("value",)),
+    "daily_bars": (("symbol", "day"), ("open", "high", "low", "close", "volume")),
+    "daily_observations": (("series_id", "day"), ("value",)),
+}
+
+
+def bulk_upsert(c, table, rows):
+    if not rows:
+        return 0
+    keys, values = UPSERT_TABLES[table]
+    columns = ", ".join(keys + values)
+    staging = f"temp.staging_{table}"
+
+    c.execute(f"CREATE TEMP TABLE IF NOT EXISTS staging_{table} AS SELECT {columns} FROM {table} WHERE 0")
+    c.execute(f"DELETE FROM {staging}")
+    c.executemany(f"INSERT INTO {staging} ({columns}) VALUES ({', '.join('?' * len(keys + values))})", rows)
+
+    # "WHERE true" keeps SQLite from parsing ON CONFLICT as a join constraint
+    c.execute(f"""
+        INSERT INTO {table} ({columns})
+        SELECT {columns} FROM {staging} WHERE true
+        ON CONFLICT({", ".join(keys)}) DO UPDATE SET
+            {", ".join(f"{col} = excluded.{col}" for col in values)}
+        WHERE {" OR ".join(f"{col} IS NOT excluded.{col}" for col in values)}
+    """)
+    changed = c.rowcount
+    c.execute(f"DELETE FROM {staging}")
+    return changed
+
+
+# === Upsert (series_id, month_key, value) rows ===
+def upsert_observations(c, rows):
+    return bulk_upsert(c, "observations", rows)
+
+
+# === Upsert (symbol, day_key, open, high, low, close, volume) rows ===
+def upsert_daily_bars(c, rows):
+    return bulk_upsert(c, "daily_bars", rows)
+
+
+# === Upsert (series_id, day_key, value) rows ===
+def upsert_daily_observations(c, rows):
+    return bulk_upsert(c, "daily_observations", rows)
+
+
+# === First trading day's bar fields for each month in [start_day, end_day) ===
+# Days are day keys (see periods.py); end_day=None reads to the latest day.
+# Returns [(month_key, field1, field2, ...)] ordered by month. The rows come
+# from one range scan of the symbol's key; months are grouped in NumPy.
+def first_bar_per_month(c, symbol, fields, start_day, end_day=None):
+    for field in fields:
+        if field not in BAR_FIELDS:
+            raise ValueError(f"Unknown bar field {field!r}, expected one of {BAR_FIELDS}")
+    c.execute(f"""
+        SELECT day, {", ".join(fields)}
+        FROM daily_bars
+        WHERE symbol = ? AND day >= ? AND day < ? AND close IS NOT NULL
+        ORDER BY day
+    """, (symbol, start_day, MAX_DAY if end_day is None else end_day))
+    return _first_per_month(c.fetchall(), len(fields))
+
+
+# === First daily value for each month in [start_day, end_day) ===
+# Returns [(month_key, value)] ordered by month.
+def first_observation_per_month(c, series_id, start_day, end_day=None):
+    c.execute("""
+        SELECT day, value
+        FROM daily_observations
+        WHERE series_id = ? AND day >= ? AND day < ? AND value IS NOT NULL
+        ORDER BY day
+    """, (series_id, start_day, MAX_DAY if end_day is None else end_day))
+    return _first_per_month(c.fetchall(), 1)
+
+
+def _first_per_month(rows, width):
+    data = np.array(rows, dtype="float64").reshape(-1, width + 1)
+    periods, values = select_per_period(days_to_datetime64(data[:, 0].astype("int64")), data[:, 1:])
+    return [(period,) + tuple(row) for period, row in zip(month_keys(periods).tolist(), values.tolist())]
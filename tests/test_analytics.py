@@ -0,0 +1,101 @@
+# === tests/test_analytics.py ===
+# NaN edge cases of the analytics kernels, checked against numpy and pandas.
+
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from analytics import correlation_matrix, first_valid, nan_mean, nan_std, price_kernel
+
+NAN = np.nan
+
+
+# Ragged columns: different start months and gaps in the middle
+def ragged(rows=60, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.normal(100, 10, (rows, 4)).cumsum(axis=0)
+    matrix[:20, 0] = NAN
+    matrix[rng.random(rows) < 0.2, 1] = NAN
+    matrix[45:, 2] = NAN
+    return matrix
+
+
+# Fails the test on "Mean of empty slice" and similar warnings
+@pytest.fixture
+def no_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        yield
+
+
+def test_nan_mean_and_std_match_numpy_on_ragged_columns(no_warnings):
+    matrix = ragged()
+    np.testing.assert_allclose(nan_mean(matrix), np.nanmean(matrix, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(nan_std(matrix), np.nanstd(matrix, axis=0), rtol=1e-12)
+
+
+def test_nan_mean_and_std_of_all_nan_column_is_nan(no_warnings):
+    matrix = np.array([[1.0, NAN], [3.0, NAN]])
+    np.testing.assert_array_equal(nan_mean(matrix), [2.0, NAN])
+    np.testing.assert_array_equal(nan_std(matrix), [1.0, NAN])
+
+
+def test_first_valid():
+    matrix = np.array([[NAN, 5.0, NAN],
+                       [2.0, 6.0, NAN],
+                       [3.0, NAN, NAN]])
+    np.testing.assert_array_equal(first_valid(matrix), [2.0, 5.0, NAN])
+
+
+def test_first_valid_of_zero_rows_is_nan():
+    np.testing.assert_array_equal(first_valid(np.empty((0, 3))), [NAN, NAN, NAN])
+
+
+def test_correlation_matches_pandas_pairwise_on_ragged_columns(no_warnings):
+    matrix = ragged()
+    expected = pd.DataFrame(matrix).corr().to_numpy()
+    np.testing.assert_allclose(correlation_matrix(matrix), expected, rtol=1e-10, atol=1e-12)
+
+
+def test_correlation_pairs_with_fewer_than_two_shared_rows_are_nan(no_warnings):
+    matrix = np.array([[1.0, NAN, 1.0],
+                       [2.0, NAN, 2.0],
+                       [3.0, 7.0, NAN],
+                       [NAN, 8.0, 4.0]])
+    corr = correlation_matrix(matrix)
+    assert corr[0, 2] == pytest.approx(1.0)   # three shared rows
+    assert np.isnan(corr[0, 1]) and np.isnan(corr[1, 0])   # one shared row
+    assert np.isnan(corr[1, 2]) and np.isnan(corr[2, 1])   # one shared row
+    assert corr[0, 0] == pytest.approx(1.0)
+
+
+def test_correlation_all_nan_column_is_nan(no_warnings):
+    matrix = np.column_stack([np.arange(5.0), np.full(5, NAN)])
+    corr = correlation_matrix(matrix)
+    assert corr[0, 0] == pytest.approx(1.0)
+    assert np.isnan(corr[:, 1]).all() and np.isnan(corr[1, :]).all()
+
+
+def test_correlation_with_zero_variance_column_is_nan(no_warnings):
+    matrix = np.column_stack([np.arange(6.0), np.full(6, 4.0), [1.0, 3, 2, 5, 4, 6]])
+    corr = correlation_matrix(matrix)
+    assert np.isnan(corr[0, 1]) and np.isnan(corr[1, 2]) and np.isnan(corr[1, 1])
+    assert corr[0, 2] == pytest.approx(pd.Series(matrix[:, 0]).corr(pd.Series(matrix[:, 2])))
+
+
+def test_correlation_is_clipped_to_unit_range():
+    x = np.linspace(0, 1, 50) * 1e8
+    corr = correlation_matrix(np.column_stack([x, x * 3 + 1]))
+    assert np.all(np.abs(corr) <= 1)
+
+
+def test_price_kernel_keeps_gaps_missing(no_warnings):
+    prices = np.array([[NAN, 10.0],
+                       [4.0, 11.0],
+                       [5.0, NAN],
+                       [6.0, 12.0]])
+    kernel = price_kernel(prices, np.array([1.0, 2.0, 2.0, 3.0]))
+    np.testing.assert_allclose(kernel["real"], prices / [[1.0], [2.0], [2.0], [3.0]])
+    np.testing.assert_allclose(kernel["normalized"][:, 0], [NAN, 100, 125, 100])
+    np.testing.assert_allclose(kernel["returns"], [[NAN, 0.1], [0.25, NAN], [0.2, NAN]])
+    np.testing.assert_allclose(kernel["log_returns"], np.log1p(kernel["returns"]))
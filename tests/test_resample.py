@@ -0,0 +1,108 @@
+# === tests/test_resample.py ===
+# Per-month selection checked against pandas' resample("MS"), on shuffled
+# input with NaN values and a missing month, plus the period key round trips.
+
+import numpy as np
+import pandas as pd
+import pytest
+from periods import day_key, day_keys, days_to_datetime64, month_key, month_keys, months_to_datetime64
+from resample import select_per_period
+
+NAN = np.nan
+
+
+# Business days over eight months, March dropped entirely, some NaN values,
+# rows shuffled the way an API or a dict of rows can return them
+def gappy_daily(seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2021-01-01", "2021-08-31")
+    dates = dates[dates.month != 3]
+    values = rng.normal(100, 5, len(dates))
+    values[rng.random(len(dates)) < 0.1] = NAN
+    order = rng.permutation(len(dates))
+    return dates[order], values[order]
+
+
+# pandas reference: one row per month that has data, as (periods, values)
+def pandas_per_month(dates, values, how):
+    resampled = getattr(pd.Series(values, index=dates).dropna().resample("MS"), how)().dropna()
+    periods = resampled.index.to_numpy().astype("datetime64[M]")
+    return periods, resampled.to_numpy()
+
+
+@pytest.mark.parametrize("how", ["first", "last", "mean", "ohlc"])
+def test_matches_pandas_resample(how):
+    dates, values = gappy_daily()
+    periods, out = select_per_period(dates, values, how=how)
+    expected_periods, expected = pandas_per_month(dates, values, how)
+
+    np.testing.assert_array_equal(periods, expected_periods)
+    np.testing.assert_allclose(out, expected, rtol=1e-12)
+    assert np.datetime64("2021-03") not in periods
+
+
+def test_iso_strings_and_datetime_index_agree():
+    dates, values = gappy_daily()
+    from_index = select_per_period(dates, values)
+    from_strings = select_per_period(dates.strftime("%Y-%m-%d").tolist(), values)
+    np.testing.assert_array_equal(from_index[0], from_strings[0])
+    np.testing.assert_array_equal(from_index[1], from_strings[1])
+
+
+@pytest.mark.parametrize("how", ["first", "last", "mean", "ohlc"])
+def test_limit_keeps_the_earliest_months(how):
+    dates, values = gappy_daily()
+    all_periods, all_out = select_per_period(dates, values, how=how)
+    periods, out = select_per_period(dates, values, how=how, limit=3)
+
+    np.testing.assert_array_equal(periods, all_periods[:3])
+    np.testing.assert_array_equal(out, all_out[:3])
+    # A limit beyond the data keeps everything
+    np.testing.assert_array_equal(select_per_period(dates, values, how=how, limit=100)[1], all_out)
+
+
+def test_mean_of_several_fields_skips_rows_with_any_nan():
+    dates = np.array(["2021-01-05", "2021-02-01", "2021-01-04", "2021-01-06"], dtype="datetime64[D]")
+    values = np.array([[1.0, 10.0], [5.0, 50.0], [3.0, 30.0], [NAN, 99.0]])
+    periods, out = select_per_period(dates, values, how="mean")
+
+    np.testing.assert_array_equal(periods, np.array(["2021-01", "2021-02"], dtype="datetime64[M]"))
+    np.testing.assert_array_equal(out, [[2.0, 20.0], [5.0, 50.0]])
+
+
+@pytest.mark.parametrize("how", ["first", "last", "mean", "ohlc"])
+def test_empty_and_all_nan_input(how):
+    for dates, values in [([], []), (["2021-01-04", "2021-02-01"], [NAN, NAN])]:
+        periods, out = select_per_period(dates, values, how=how)
+        assert periods.dtype == np.dtype("datetime64[M]")
+        assert len(periods) == 0 and len(out) == 0
+
+
+def test_rejects_unknown_aggregation_and_2d_ohlc():
+    with pytest.raises(ValueError):
+        select_per_period(["2021-01-04"], [1.0], how="median")
+    with pytest.raises(ValueError):
+        select_per_period(["2021-01-04"], [[1.0, 2.0]], how="ohlc")
+
+
+def test_month_keys_round_trip():
+    months = np.arange("1969-11", "2031-03", dtype="datetime64[M]")
+    keys = month_keys(months)
+
+    assert keys[0] == -2 and month_key("1970-01") == 0
+    np.testing.assert_array_equal(months_to_datetime64(keys), months)
+    # Any day of a month maps to that month's key
+    days = pd.DatetimeIndex(["2016-07-01", "2016-07-31", "2024-02-29"])
+    np.testing.assert_array_equal(month_keys(days), [month_key("2016-07")] * 2 + [month_key("2024-02")])
+
+
+def test_day_keys_round_trip():
+    days = np.arange("1969-12-25", "2031-01-10", dtype="datetime64[D]")
+    keys = day_keys(days)
+
+    assert keys[0] == -7 and day_key("1970-01-01") == 0
+    np.testing.assert_array_equal(days_to_datetime64(keys), days)
+    # ISO strings, datetime.date and DatetimeIndex give the same keys
+    stamps = pd.DatetimeIndex(["2016-07-01", "2024-02-29"])
+    np.testing.assert_array_equal(day_keys(stamps), day_keys(["2016-07-01", "2024-02-29"]))
+    assert day_keys(stamps).tolist() == [day_key(stamps[0].date()), day_key(stamps[1].date())]
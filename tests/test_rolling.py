@@ -0,0 +1,80 @@
+# === tests/test_rolling.py ===
+# Rolling statistics checked against pandas' rolling windows, with NaN gaps
+# and min_periods.
+
+import numpy as np
+import pandas as pd
+import pytest
+from rolling import cumulative_moments, rolling_corr, rolling_cov, rolling_mean, rolling_stats, rolling_vol
+
+NAN = np.nan
+
+
+# Three columns with a late start, scattered gaps and an early end
+def gappy(rows=120, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.normal(0, 1, (rows, 3)) + [0, 50, 1000]
+    matrix[:15, 0] = NAN
+    matrix[rng.random(rows) < 0.25, 1] = NAN
+    matrix[90:, 2] = NAN
+    return matrix
+
+
+# pandas pairwise rolling cov/corr as a (rows, columns, columns) array
+def pandas_pairwise(frame, window, min_periods, method, **kwargs):
+    rolled = getattr(frame.rolling(window, min_periods=min_periods), method)(pairwise=True, **kwargs)
+    return rolled.to_numpy().reshape(len(frame), frame.shape[1], frame.shape[1])
+
+
+@pytest.mark.parametrize("window, min_periods", [(1, None), (5, None), (12, 3), (30, 10), (200, 2)])
+def test_matches_pandas_with_gaps(window, min_periods):
+    matrix = gappy()
+    frame = pd.DataFrame(matrix)
+    rolled = frame.rolling(window, min_periods=window if min_periods is None else min_periods)
+
+    np.testing.assert_allclose(rolling_mean(matrix, window, min_periods), rolled.mean().to_numpy(),
+                               rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(rolling_vol(matrix, window, min_periods), rolled.std(ddof=0).to_numpy(),
+                               rtol=1e-7, atol=1e-7)
+    np.testing.assert_allclose(rolling_vol(matrix, window, min_periods, ddof=1), rolled.std().to_numpy(),
+                               rtol=1e-7, atol=1e-7)
+    mp = window if min_periods is None else min_periods
+    np.testing.assert_allclose(rolling_cov(matrix, window, min_periods, ddof=1),
+                               pandas_pairwise(frame, window, mp, "cov"), rtol=1e-7, atol=1e-7)
+    if window > 1:
+        np.testing.assert_allclose(rolling_corr(matrix, window, min_periods),
+                                   pandas_pairwise(frame, window, mp, "corr"), rtol=1e-7, atol=1e-7)
+
+
+def test_several_windows_share_one_pass():
+    matrix = gappy()
+    stats = rolling_stats(matrix, (3, 24))
+    assert set(stats) == {3, 24}
+    for window, result in stats.items():
+        assert set(result) == {"mean", "vol", "cov", "corr"}
+        np.testing.assert_allclose(result["vol"], rolling_vol(matrix, window))
+        # The cov diagonal is the population variance
+        np.testing.assert_allclose(np.diagonal(result["cov"], axis1=1, axis2=2), result["vol"] ** 2,
+                                   rtol=1e-7, atol=1e-9)
+
+
+def test_mean_and_vol_do_not_build_pairwise_sums():
+    prefix = cumulative_moments(gappy())
+    assert prefix["count"].shape == (121, 3)
+    assert "products" not in prefix
+    assert set(rolling_stats(gappy(), [5], stats=("vol",))[5]) == {"vol"}
+
+
+def test_long_history_stays_accurate():
+    # Large level, small moves: the prefix sums must not lose the window variance
+    rng = np.random.default_rng(1)
+    matrix = 1e6 + rng.normal(0, 1, (20000, 2)).cumsum(axis=0)
+    expected = pd.DataFrame(matrix).rolling(21).std(ddof=0).to_numpy()
+    np.testing.assert_allclose(rolling_vol(matrix, 21), expected, rtol=1e-5)
+
+
+def test_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        rolling_mean(gappy(), 0)
+    with pytest.raises(ValueError):
+        rolling_stats(gappy(), [3], stats=("median",))
@@ -0,0 +1,128 @@
+# === writer.py ===
+# Single-writer queue for concurrent ingestion.
+#
+# Fetchers (producers) do their reads and network calls on their own threads
+# and hand the database work to one Writer thread as a write op: a function
+# that takes a cursor. The writer owns the only write connection and applies
+# queued ops in batched transactions, so parallel fetchers never compete for
+# the write lock. The queue is bounded: when the disk falls behind, submit()
+# blocks the producer until there is room again.
+#
+# Each op runs inside its own SAVEPOINT, so a failing op is rolled back and
+# recorded in Writer.errors without losing the rest of its batch. Ops submitted
+# after close() (e.g. by a source that outlived its timeout) are not applied;
+# they are logged and recorded in Writer.dropped.
+
+import queue
+import threading
+import time
+from db import connect
+
+QUEUE_SIZE = 64          # Pending ops before submit() blocks
+BATCH_OPS = 32           # Most ops applied in one transaction
+FLUSH_INTERVAL = 0.5     # Seconds to wait for more ops before committing a batch
+
+_STOP = object()
+
+
+class Writer:
+    def __init__(self, path=None, queue_size=QUEUE_SIZE, batch_ops=BATCH_OPS,
+                 flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.batch_ops = batch_ops
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.errors = []      # (name, "Type: message") of every failed op
+        self.dropped = []     # names of ops submitted after close()
+        self.applied = 0
+        self.commits = 0
+        self._closed = False
+        self._lock = threading.Lock()   # Orders submit() against close(), so no op lands after _STOP
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    # === Queue a write op; blocks while the queue is full (backpressure) ===
+    # Returns False, without raising, if the writer is already closed.
+    def submit(self, name, op):
+        with self._lock:
+            if not self._closed:
+                self.queue.put((name, op))
+                return True
+        self.dropped.append(name)
+        print(f"Write dropped for {name}: writer is already closed")
+        return False
+
+    # === Apply everything still queued, then stop the writer thread ===
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self.queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        with connect(self.path) as conn:
+            stopping = False
+            while not stopping:
+                item = self.queue.get()
+                if item is _STOP:
+                    break
+
+                # Collect more ops until the batch is full or the flush interval passes
+                batch = [item]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_ops:
+                    try:
+                        item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+                self._apply(conn, batch)
+
+    def _apply(self, conn, batch):
+        c = conn.cursor()
+        try:
+            c.execute("BEGIN IMMEDIATE")
+            for name, op in batch:
+                c.execute("SAVEPOINT op")
+                try:
+                    op(c)
+                    c.execute("RELEASE op")
+                    self.applied += 1
+                except Exception as e:
+                    c.execute("ROLLBACK TO op")
+                    c.execute("RELEASE op")
+                    self.errors.append((name, f"{type(e).__name__}: {e}"))
+                    print(f"Write failed for {name}: {type(e).__name__}: {e}")
+            conn.commit()
+            self.commits += 1
+        except Exception as e:
+            # The transaction itself failed (e.g. disk full): the whole batch is lost
+            conn.rollback()
+            self.errors.extend((name, f"{type(e).__name__}: {e}") for name, _ in batch)
+            print(f"Write batch of {len(batch)} failed: {type(e).__name__}: {e}")
+
+
+# === Run a write op through the writer, or directly in its own transaction ===
+# Fetchers call this so they work both standalone and under fetch_all.
+def apply_write(name, op, writer=None):
+    if writer is not None:
+        writer.submit(name, op)
+        return
+    with connect() as conn:
+        op(conn.cursor())